@@ -0,0 +1,86 @@
+import logging as log
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+
+class ClosetStore:
+    """
+    검출된 옷 저장 단계
+    - 한 이미지의 모든 crop을 스레드 풀에서 동시에 Cloud Storage에 업로드
+    - Firestore 문서는 WriteBatch 하나로 한 번에 커밋
+    """
+
+    # 추천 모델이 사용하는 옷 필드
+    RECOMMEND_FIELDS = ['type', 'color', 'length', 'material', 'printing']
+
+    def __init__(self, db, bucket, max_workers=8):
+        self.db = db
+        self.bucket = bucket
+        self.upload_pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='closet-upload')
+        # 백그라운드 저장 작업 (업로드 풀과 분리해서 풀 고갈로 인한 교착을 막음)
+        self.background_pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='closet-save')
+
+    def _upload(self, uid, image_name, garment):
+        blob = self.bucket.blob(f'images/{uid}/{garment["type"] + "_" + image_name}')
+        blob.upload_from_string(garment['image'], content_type='image/jpeg')
+        return blob.public_url
+
+    def save(self, uid, image_name, garments):
+        # 이미지를 Google Cloud Storage에 동시 업로드
+        image_urls = list(self.upload_pool.map(lambda garment: self._upload(uid, image_name, garment), garments))
+        add_date = str(datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+
+        # Firestore에 이미지 URL과 기타 정보를 한 번에 저장
+        batch = self.db.batch()
+        closet_ref = self.db.collection('users').document(uid).collection('closet')
+        doc_ids = []
+        for garment, image_url in zip(garments, image_urls):
+            doc_ref = closet_ref.document()
+            batch.set(doc_ref, {
+                'type': garment['type'],
+                'imageUrl': image_url,
+                'imageName': image_name,
+                'color': garment.get('color'),
+                'length': garment.get('length'),
+                'material': garment.get('material'),
+                'printing': garment.get('print'),
+                'style': garment.get('style'),
+                'addDate': add_date
+            })
+            doc_ids.append(doc_ref.id)
+        batch.commit()
+        return doc_ids
+
+    def save_in_background(self, uid, image_name, garments):
+        # 속성 검출이 끝나면 바로 응답하고 저장은 백그라운드에서 마무리
+        future = self.background_pool.submit(self.save, uid, image_name, garments)
+
+        def log_failure(done):
+            # 예외는 한 번만 꺼내서 기록
+            error = done.exception()
+            if error is not None:
+                log.error(f"옷 저장 실패 (uid={uid}): {error}")
+
+        future.add_done_callback(log_failure)
+        return future
+
+    def query(self, uid, types=None, fields=None):
+        # 종류 필터(where in, 최대 30개 값)와 필드 선택을 Firestore 쪽에서 처리
+        query = self.db.collection('users').document(uid).collection('closet')
+        if types is not None:
+            query = query.where('type', 'in', list(types))
+        if fields is not None:
+            query = query.select(fields)
+        return [{'id': doc.id, **doc.to_dict()} for doc in query.stream()]
+
+    def get(self, uid, cloth_id):
+        doc = self.db.collection('users').document(uid).collection('closet').document(cloth_id).get()
+        return {'id': doc.id, **doc.to_dict()} if doc.exists else None
+
+    def get_many(self, uid, cloth_ids):
+        # 여러 옷 문서를 한 번의 get_all 로 조회 (id -> 옷, 없는 문서는 제외)
+        closet = self.db.collection('users').document(uid).collection('closet')
+        refs = [closet.document(cloth_id) for cloth_id in dict.fromkeys(cloth_ids)]
+        if not refs:
+            return {}
+        return {doc.id: {'id': doc.id, **doc.to_dict()} for doc in self.db.get_all(refs) if doc.exists}
@@ -5,6 +5,9 @@ Train a YOLOv5 classifier model on a classification yamls.
 Usage - Single-GPU training:
     $ python classify/train.py --model yolov5s-cls.pt --data imagenette160 --epochs 5 --img 224
 
+Usage - Multi-task training (one shared backbone, one head per attribute, data/<task>/{train,val}):
+    $ python classify/train.py --model yolov5s.pt --data attributes --tasks color length material print style
+
 Usage - Multi-GPU DDP training:
     $ python -m torch.distributed.run --nproc_per_node 4 --master_port 2022 classify/train.py --model yolov5s-cls.pt --data imagenet --epochs 5 --img 224 --device 0,1,2,3
 
@@ -38,7 +41,7 @@ ROOT = Path(os.path.relpath(ROOT, Path.cwd()))  # relative
 
 from classify import val as validate
 from models.experimental import attempt_load
-from models.yolo import ClassificationModel, DetectionModel
+from models.yolo import ClassificationModel, DetectionModel, MultiTaskClassificationModel
 from utils.dataloaders import create_classification_dataloader
 from utils.general import (
     DATASETS_DIR,
@@ -306,6 +309,167 @@ def train(opt, device):
         logger.log_model(best, epochs, metadata=meta)
 
 
+class TaskView(torch.nn.Module):
+    # Exposes a single task of a MultiTaskClassificationModel to classify/val.py
+    def __init__(self, model, task):
+        """Wraps multi-task `model` so that calling it returns the logits of `task` only."""
+        super().__init__()
+        self.model, self.task = model, task
+
+    def forward(self, x):
+        """Returns the `task` logits of the wrapped multi-task model."""
+        return self.model(x)[self.task]
+
+
+def train_multitask(opt, device):
+    """Trains a MultiTaskClassificationModel, stepping every task head on its own dataset each iteration."""
+    assert LOCAL_RANK == -1, "Multi-task training does not support DDP mode yet"
+    init_seeds(opt.seed + 1, deterministic=True)
+    save_dir, data, bs, epochs, nw, imgsz = (
+        opt.save_dir,
+        Path(opt.data),
+        opt.batch_size,
+        opt.epochs,
+        min(os.cpu_count() - 1, opt.workers),
+        opt.imgsz,
+    )
+    cuda = device.type != "cpu"
+
+    # Directories
+    wdir = save_dir / "weights"
+    wdir.mkdir(parents=True, exist_ok=True)  # make dir
+    last, best = wdir / "last.pt", wdir / "best.pt"
+
+    # Save run settings
+    yaml_save(save_dir / "opt.yaml", vars(opt))
+
+    # Logger
+    logger = GenericLogger(opt=opt, console_logger=LOGGER)
+
+    # Dataloaders, one classification dataset per task
+    data_dir = data if data.is_dir() else (DATASETS_DIR / data)
+    trainloaders, testloaders, nc = {}, {}, {}
+    for task in opt.tasks:
+        task_dir = data_dir / task
+        nc[task] = len([x for x in (task_dir / "train").glob("*") if x.is_dir()])  # number of classes
+        test_dir = task_dir / "test" if (task_dir / "test").exists() else task_dir / "val"  # data/test or data/val
+        trainloaders[task] = create_classification_dataloader(
+            path=task_dir / "train", imgsz=imgsz, batch_size=bs, augment=True, cache=opt.cache, rank=-1, workers=nw
+        )
+        testloaders[task] = create_classification_dataloader(
+            path=test_dir, imgsz=imgsz, batch_size=bs * 2, augment=False, cache=opt.cache, rank=-1, workers=nw
+        )
+
+    # Model
+    with WorkingDirectory(ROOT):
+        model = attempt_load(opt.model, device="cpu", fuse=False)
+    assert isinstance(model, DetectionModel), "--tasks needs YOLOv5 detection weights, i.e. '--model yolov5s.pt'"
+    model = MultiTaskClassificationModel(model=model, tasks=nc, cutoff=opt.cutoff or 10)
+    model.names = {task: trainloaders[task].dataset.classes for task in opt.tasks}  # attach class names
+    model.transforms = testloaders[opt.tasks[0]].dataset.torch_transforms  # attach inference transforms
+    for m in model.modules():
+        if isinstance(m, torch.nn.Dropout) and opt.dropout is not None:
+            m.p = opt.dropout  # set dropout
+    for p in model.parameters():
+        p.requires_grad = True  # for training
+    model = model.to(device)
+    model_info(model)
+
+    # Optimizer, scheduler, EMA
+    optimizer = smart_optimizer(model, opt.optimizer, opt.lr0, momentum=0.9, decay=opt.decay)
+    lrf = 0.01  # final lr (fraction of lr0)
+    lf = lambda x: (1 - x / epochs) * (1 - lrf) + lrf  # linear
+    scheduler = lr_scheduler.LambdaLR(optimizer, lr_lambda=lf)
+    ema = ModelEMA(model)
+
+    # Train, the longest task dataset sets the epoch length and shorter ones are cycled
+    t0 = time.time()
+    criterion = smartCrossEntropyLoss(label_smoothing=opt.label_smoothing)  # loss function
+    best_fitness = 0.0
+    scaler = amp.GradScaler(enabled=cuda)
+    nb = max(len(x) for x in trainloaders.values())  # number of batches
+    LOGGER.info(
+        f"Logging results to {colorstr('bold', save_dir)}\n"
+        f"Starting {opt.model} multi-task training on {', '.join(opt.tasks)} for {epochs} epochs...\n\n"
+        f"{'Epoch':>10}{'GPU_mem':>10}{'train_loss':>12}"
+    )
+    for epoch in range(epochs):
+        tloss = 0.0
+        model.train()
+        iterators = {task: iter(loader) for task, loader in trainloaders.items()}
+        pbar = tqdm(range(nb), total=nb, bar_format=TQDM_BAR_FORMAT)
+        for i in pbar:
+            loss = 0.0
+            for task in opt.tasks:
+                try:
+                    images, labels = next(iterators[task])
+                except StopIteration:  # restart shorter task datasets
+                    iterators[task] = iter(trainloaders[task])
+                    images, labels = next(iterators[task])
+                images, labels = images.to(device, non_blocking=True), labels.to(device)
+
+                # Forward, only the head of the task that owns this batch is supervised
+                with amp.autocast(enabled=cuda):
+                    loss += criterion(model(images)[task], labels)
+
+            # Backward
+            scaler.scale(loss).backward()
+
+            # Optimize
+            scaler.unscale_(optimizer)  # unscale gradients
+            torch.nn.utils.clip_grad_norm_(model.parameters(), max_norm=10.0)  # clip gradients
+            scaler.step(optimizer)
+            scaler.update()
+            optimizer.zero_grad()
+            ema.update(model)
+
+            # Print
+            tloss = (tloss * i + loss.item()) / (i + 1)  # update mean losses
+            mem = "%.3gG" % (torch.cuda.memory_reserved() / 1e9 if torch.cuda.is_available() else 0)  # (GB)
+            pbar.desc = f"{f'{epoch + 1}/{epochs}':>10}{mem:>10}{tloss:>12.3g}"
+
+        # Scheduler
+        scheduler.step()
+
+        # Test every task, fitness is the mean top1 accuracy
+        metrics = {"train/loss": tloss, "lr/0": optimizer.param_groups[0]["lr"]}
+        for task in opt.tasks:
+            top1, top5, vloss = validate.run(
+                model=TaskView(ema.ema, task), dataloader=testloaders[task], criterion=criterion
+            )
+            metrics.update({f"{task}/loss": vloss, f"{task}/accuracy_top1": top1, f"{task}/accuracy_top5": top5})
+        fitness = sum(metrics[f"{task}/accuracy_top1"] for task in opt.tasks) / len(opt.tasks)
+        best_fitness = max(best_fitness, fitness)
+        logger.log_metrics(metrics, epoch)
+
+        # Save model
+        final_epoch = epoch + 1 == epochs
+        if (not opt.nosave) or final_epoch:
+            ckpt = {
+                "epoch": epoch,
+                "best_fitness": best_fitness,
+                "model": deepcopy(ema.ema).half(),
+                "ema": None,
+                "updates": ema.updates,
+                "optimizer": None,
+                "opt": vars(opt),
+                "git": GIT_INFO,  # {remote, branch, commit} if a git repo
+                "date": datetime.now().isoformat(),
+            }
+
+            # Save last, best and delete
+            torch.save(ckpt, last)
+            if best_fitness == fitness:
+                torch.save(ckpt, best)
+            del ckpt
+
+    LOGGER.info(
+        f"\nTraining complete ({(time.time() - t0) / 3600:.3f} hours)"
+        f"\nResults saved to {colorstr('bold', save_dir)}"
+        f"\nServe:           ClothesDetector(attribute_weights='{best}')\n"
+    )
+
+
 def parse_opt(known=False):
     """Parses command line arguments for YOLOv5 training including model path, yamls, epochs, and more, returning
     parsed arguments.
@@ -329,6 +493,7 @@ def parse_opt(known=False):
     parser.add_argument("--decay", type=float, default=5e-5, help="weights decay")
     parser.add_argument("--label-smoothing", type=float, default=0.1, help="Label smoothing epsilon")
     parser.add_argument("--cutoff", type=int, default=None, help="Model layer cutoff index for Classify() head")
+    parser.add_argument("--tasks", nargs="+", default=None, help="multi-task heads, i.e. --tasks color length style")
     parser.add_argument("--dropout", type=float, default=None, help="Dropout (fraction)")
     parser.add_argument("--verbose", action="store_true", help="Verbose mode")
     parser.add_argument("--seed", type=int, default=0, help="Global training seed")
@@ -357,7 +522,10 @@ def main(opt):
     opt.save_dir = increment_path(Path(opt.project) / opt.name, exist_ok=opt.exist_ok)  # increment run
 
     # Train
-    train(opt, device)
+    if opt.tasks:
+        train_multitask(opt, device)
+    else:
+        train(opt, device)
 
 
 def run(**kwargs):
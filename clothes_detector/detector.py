@@ -32,7 +32,11 @@ import argparse
 import csv
 import os
 import platform
+import queue
 import sys
+import threading
+import time
+from concurrent.futures import Future
 from pathlib import Path
 import pathlib
 pathlib.PosixPath = pathlib.WindowsPath
@@ -49,6 +53,8 @@ from ultralytics.utils.plotting import Annotator, colors, save_one_box
 
 
 from models.common import DetectMultiBackend
+from models.experimental import attempt_load
+from utils.augmentations import classify_transforms, letterbox
 from utils.dataloaders import IMG_FORMATS, VID_FORMATS, LoadImages, LoadScreenshots, LoadStreams
 from utils.general import (
     LOGGER,
@@ -341,6 +347,212 @@ def detect_clothes_feature_sub(agnostic_nms, augment, classes, conf_thres, data,
 
 
 
+class ClothesDetector:
+    """Category and attribute models kept resident for the lifetime of the process."""
+
+    def __init__(
+        self,
+        weights=ROOT / "weights/yolov5_category/weights/best.pt",  # category model path
+        data=ROOT / "yamls/category.yaml",  # yamls.yaml path
+        imgsz=(640, 640),  # inference size (height, width)
+        conf_thres=0.25,  # confidence threshold
+        iou_thres=0.45,  # NMS IOU threshold
+        max_det=1000,  # maximum detections per image
+        attribute_batch_size=32,  # maximum crops per attribute model forward pass
+        attribute_weights=None,  # multi-task attribute model path (classify/train.py --tasks), replaces class_names
+        attribute_imgsz=224,  # multi-task attribute model inference size (pixels)
+        device="",  # cuda device, i.e. 0 or 0,1,2,3 or cpu
+        half=False,  # use FP16 half-precision inference
+        dnn=False,  # use OpenCV DNN for ONNX inference
+    ):
+        """Loads and fuses the category model and the attribute model(s) once, then warms them up."""
+        self.device = select_device(device)
+        self.conf_thres, self.iou_thres, self.max_det = conf_thres, iou_thres, max_det
+        self.attribute_batch_size = attribute_batch_size
+        self.model = DetectMultiBackend(weights, device=self.device, dnn=dnn, data=data, fp16=half)
+        self.imgsz = check_img_size(imgsz, s=self.model.stride)  # check image size
+        self.attribute_models = {}
+        self.attribute_model = None
+        if attribute_weights:  # one shared backbone with a head per attribute
+            self.attribute_model = attempt_load(attribute_weights, device=self.device, fuse=True)
+            self.attribute_model.half() if half else self.attribute_model.float()
+            self.attribute_imgsz = attribute_imgsz
+            self.attribute_transforms = classify_transforms(attribute_imgsz)
+        for name in class_names if self.attribute_model is None else ():
+            pt_weight_path = ROOT / rf"weights/{name}/weights/best.pt"
+            self.attribute_models[name.replace("yolov5_", "")] = DetectMultiBackend(
+                pt_weight_path, device=self.device, dnn=dnn, data=data, fp16=half
+            )
+        self.warmup()
+
+    @smart_inference_mode()
+    def warmup(self):
+        """Runs one dummy forward pass per model, also on CPU where `DetectMultiBackend.warmup` is a no-op."""
+        for model in (self.model, *self.attribute_models.values()):
+            im = torch.zeros(1, 3, *self.imgsz, dtype=torch.half if model.fp16 else torch.float, device=self.device)
+            model(im)
+        if self.attribute_model is not None:
+            p = next(self.attribute_model.parameters())
+            im = torch.zeros(1, 3, self.attribute_imgsz, self.attribute_imgsz, dtype=p.dtype, device=p.device)
+            self.attribute_model(im)
+
+    def preprocess(self, ims, model):
+        """Letterboxes BGR images the way `LoadImages` does and stacks them into a normalized Nx3xHxW tensor."""
+        auto = model.pt and len(ims) == 1  # minimum rectangle only when no other image shares the batch
+        im = np.stack([letterbox(im0, self.imgsz, stride=model.stride, auto=auto)[0] for im0 in ims])  # padded resize
+        im = np.ascontiguousarray(im.transpose((0, 3, 1, 2))[:, ::-1])  # BHWC to BCHW, BGR to RGB
+        im = torch.from_numpy(im).to(model.device)
+        im = im.half() if model.fp16 else im.float()  # uint8 to fp16/32
+        im /= 255  # 0 - 255 to 0.0 - 1.0
+        return im
+
+    @smart_inference_mode()
+    def classify_attributes(self, crops):
+        """Returns the most confident label of every attribute model for each BGR crop, None where nothing is found.
+
+        All crops are letterboxed into one batch so every attribute model runs once per `attribute_batch_size` crops.
+        """
+        if self.attribute_model is not None:
+            return self.classify_attributes_multitask(crops)
+        attributes = [{} for _ in crops]
+        for attribute, model in self.attribute_models.items():
+            for b in range(0, len(crops), self.attribute_batch_size):
+                im = self.preprocess(crops[b : b + self.attribute_batch_size], model)
+                pred = model(im)
+                pred = non_max_suppression(pred, self.conf_thres, self.iou_thres, max_det=self.max_det)
+                for i, det in enumerate(pred, start=b):
+                    attributes[i][attribute] = model.names[int(det[0, 5])] if len(det) else None
+        return attributes
+
+    @smart_inference_mode()
+    def classify_attributes_multitask(self, crops):
+        """Returns every attribute of each BGR crop from one shared-backbone forward pass per batch."""
+        model = self.attribute_model
+        p = next(model.parameters())
+        attributes = [{} for _ in crops]
+        for b in range(0, len(crops), self.attribute_batch_size):
+            im = torch.stack([self.attribute_transforms(crop) for crop in crops[b : b + self.attribute_batch_size]])
+            logits = model(im.to(p.device, p.dtype))  # {task: logits}
+            for attribute, y in logits.items():
+                for i, c in enumerate(y.argmax(1).tolist(), start=b):
+                    attributes[i][attribute] = model.names[attribute][c]
+        return attributes
+
+    @staticmethod
+    def decode(image):
+        """Decodes encoded image bytes to a BGR array once (ValueError if invalid); arrays are returned unchanged."""
+        if isinstance(image, np.ndarray):
+            return image
+        im0 = cv2.imdecode(np.frombuffer(image, dtype=np.uint8), cv2.IMREAD_COLOR) if image else None  # BGR
+        if im0 is None:
+            raise ValueError("Image could not be decoded")
+        return im0
+
+    @smart_inference_mode()
+    def detect(self, image):
+        """Detects garments in one image given as encoded bytes or a BGR array, without touching the disk."""
+        return self.detect_batch([image])[0]
+
+    @smart_inference_mode()
+    def detect_batch(self, images):
+        """Detects garments in several images with one category forward pass and one attribute pass over all crops."""
+        im0s = [self.decode(image) for image in images]
+        im = self.preprocess(im0s, self.model)
+        pred = self.model(im)
+        pred = non_max_suppression(pred, self.conf_thres, self.iou_thres, max_det=self.max_det)
+
+        results, crops = [], []
+        names = self.model.names
+        for det, im0 in zip(pred, im0s):  # per image
+            garments = []
+            if len(det):
+                # Rescale boxes from img_size to im0 size
+                det[:, :4] = scale_boxes(im.shape[2:], det[:, :4], im0.shape).round()
+                for *xyxy, conf, cls in reversed(det):
+                    croped_img = image_crop(xyxy, im0, BGR=True)
+                    crops.append(croped_img)
+                    garments.append(
+                        {
+                            "type": names[int(cls)],
+                            "confidence": float(conf),
+                            "image": cv2.imencode(".jpg", croped_img)[1].tobytes(),
+                        }
+                    )
+            results.append(garments)
+
+        # Attributes for the crops of every image in the batch
+        for garment, attributes in zip((g for garments in results for g in garments), self.classify_attributes(crops)):
+            garment.update(attributes)
+        LOGGER.info(f"{len(images)} images, {len(crops)} detections")
+        return results
+
+
+class InferenceScheduler:
+    """Collects images from concurrent requests into micro-batches for a single `ClothesDetector` worker thread."""
+
+    def __init__(self, detector, max_batch_size=8, max_wait=0.01):
+        """Starts the worker; a batch runs once `max_batch_size` images are queued or `max_wait` seconds have passed."""
+        self.detector = detector
+        self.max_batch_size, self.max_wait = max_batch_size, max_wait
+        self.queue = queue.Queue()
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def submit(self, image):
+        """Decodes one image (encoded bytes or BGR array) in the caller's thread, queues it and returns a Future.
+
+        An image that cannot be decoded raises ValueError here, so it never reaches (and fails) a shared batch.
+        """
+        im0 = self.detector.decode(image)
+        future = Future()
+        self.queue.put((im0, future))
+        return future
+
+    def detect(self, image):
+        """Blocking helper around `submit` with the same return value as `ClothesDetector.detect`."""
+        return self.submit(image).result()
+
+    def _next_batch(self):
+        """Blocks for the first pending image, then gathers more until the batch is full or the wait expires."""
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        """Worker loop: runs each micro-batch and fans the results out to the callers' futures.
+
+        If a batch fails, its images are retried one by one so an error only reaches the future of the image causing it.
+        """
+        while True:
+            batch = [(im0, future) for im0, future in self._next_batch() if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            ims, futures = zip(*batch)
+            try:
+                results = self.detector.detect_batch(ims)
+            except Exception:
+                for im0, future in batch:
+                    self._run_one(im0, future)
+                continue
+            for future, garments in zip(futures, results):
+                future.set_result(garments)
+
+    def _run_one(self, im0, future):
+        """Runs a single image and resolves its future with the garments or the exception."""
+        try:
+            future.set_result(self.detector.detect_batch([im0])[0])
+        except Exception as e:
+            future.set_exception(e)
+
+
 def parse_opt():
     """Parses command-line arguments for YOLOv5 detection, setting inference options and model configurations."""
     parser = argparse.ArgumentParser()
@@ -365,6 +365,43 @@ class ClassificationModel(BaseModel):
         self.model = None
 
 
+class MultiTaskClassificationModel(BaseModel):
+    # YOLOv5 classification model with one shared backbone and a Classify() head per task
+    def __init__(self, model=None, tasks=None, cutoff=10):
+        """Initializes a multi-task classifier from a YOLOv5 detection model `model`, a `tasks` dict of {task: nc} and
+        backbone `cutoff` index.
+        """
+        super().__init__()
+        if isinstance(model, DetectMultiBackend):
+            model = model.model  # unwrap DetectMultiBackend
+        m = model.model[cutoff - 1]  # layer replaced by the heads
+        ch = m.conv.in_channels if hasattr(m, "conv") else m.cv1.conv.in_channels  # ch into heads
+        self.model = model.model[: cutoff - 1]  # shared backbone
+        self.stride = model.stride
+        self.save = []
+        self.heads = nn.ModuleDict()
+        for task, nc in tasks.items():
+            c = Classify(ch, nc)  # Classify()
+            c.i, c.f, c.type = m.i, m.f, "models.common.Classify"  # index, from, type
+            self.heads[task] = c
+        self.nc = dict(tasks)
+        self.names = {task: [str(i) for i in range(nc)] for task, nc in tasks.items()}  # default names
+
+    def forward(self, x, profile=False, visualize=False):
+        """Computes backbone features once and returns a {task: logits} dict with one entry per head."""
+        x = self._forward_once(x, profile, visualize)  # shared backbone features
+        return {task: head(x) for task, head in self.heads.items()}
+
+    def fuse(self):
+        """Fuses Conv2d() and BatchNorm2d() layers in the shared backbone and every task head."""
+        for m in self.heads.modules():
+            if isinstance(m, (Conv, DWConv)) and hasattr(m, "bn"):
+                m.conv = fuse_conv_and_bn(m.conv, m.bn)  # update conv
+                delattr(m, "bn")  # remove batchnorm
+                m.forward = m.forward_fuse  # update forward
+        return super().fuse()
+
+
 def parse_model(d, ch):
     """Parses a YOLOv5 model from a dict `d`, configuring layers based on input channels `ch` and model architecture."""
     LOGGER.info(f"\n{'':>3}{'from':>18}{'n':>3}{'params':>10}  {'module':<40}{'arguments':<30}")
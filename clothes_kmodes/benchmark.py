@@ -0,0 +1,222 @@
+import argparse
+import contextlib
+import io
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from clothes_kmodes.server_api import run
+import clothes_kmodes.clothes_enum as CLTH
+import clothes_kmodes.config.config as cfg
+import clothes_kmodes.main as clothes_main
+
+try:
+    import resource  # 윈도우에는 없음
+except ImportError:
+    resource = None
+
+"""
+추천 모델 오프라인 벤치마크
+- datasets/user_info.csv 의 사용자/날씨 조건을 datasets/user_clothes.json 옷장(또는 합성 옷장)에 재생
+- recommend_select(0: 전체, 1: 상의, 2: 하의)별 지연 시간 p50/p95/p99, 처리량, 단계별 시간(predict, sort, match), 최대 메모리
+- 결과는 JSON 으로 저장해서 버전 간 비교
+
+예) python -m clothes_kmodes.benchmark --limit 500 --closet-sizes 0 50 500 --output bench.json
+    (--closet-sizes 의 0 은 user_clothes.json 옷장 그대로)
+"""
+
+user_info_cols = ['나이', '성별', '스타일', '일 평균 기온', '일 평균 기상', '일 평균 습도', '일 평균 풍속']
+modes = {0: "both", 1: "top", 2: "bottom"}
+
+
+def load_contexts(path, limit=None, seed=0):
+    # user_info.csv 는 cp949 인코딩
+    df = pd.read_csv(path, encoding='cp949')
+    if limit is not None and limit < len(df):
+        df = df.sample(n=limit, random_state=seed)
+    return df.reset_index(drop=True)
+
+
+def selected_info_of(row, type):
+    # 행에 기록된 상의/하의를 사용자가 선택한 옷으로 사용 (색상, 프린트, 소재, 기장, 카테고리)
+    return tuple(row[f'{type} {suffix}'] for suffix in ['색상', '프린트', '소재', '기장', '카테고리'])
+
+
+def synthesize_closet(table, size, seed=0):
+    # 클러스터 테이블에서 임의 행을 골라 상의/하의를 번갈아 만든 합성 옷장
+    rng = np.random.default_rng(seed)
+    rows = table.iloc[rng.integers(0, len(table), size)]
+    closet = []
+    for i, (_, row) in enumerate(rows.iterrows()):
+        type = "상의" if i % 2 == 0 else "하의"
+        closet.append({'id': f'synthetic-{i}', 'type': row[f'{type} 카테고리'], 'color': row[f'{type} 색상'],
+                       'length': row[f'{type} 기장'], 'material': row[f'{type} 소재'],
+                       'printing': row[f'{type} 프린트']})
+    return closet
+
+
+def summarize(seconds):
+    ms = np.asarray(seconds) * 1000
+    if len(ms) == 0:
+        return {'count': 0}
+    return {'count': int(len(ms)), 'mean_ms': float(ms.mean()), 'p50_ms': float(np.percentile(ms, 50)),
+            'p95_ms': float(np.percentile(ms, 95)), 'p99_ms': float(np.percentile(ms, 99)), 'max_ms': float(ms.max())}
+
+
+def args_of(row, mode):
+    user_info = tuple(row[col] for col in user_info_cols)
+    selected_info = None
+    if mode == 1:
+        selected_info = selected_info_of(row, "하의")
+    elif mode == 2:
+        selected_info = selected_info_of(row, "상의")
+    return user_info, selected_info
+
+
+def time_stages(user_info, selected_info, clothes_attributes, mode):
+    """
+    main() 과 같은 경로를 단계별로 나눠서 시간 측정
+    - predict: 클러스터 할당, sort: 정렬된 클러스터 데이터 조회, match: 옷장 매칭
+    """
+    stages = {'predict': 0.0, 'sort': 0.0, 'match': 0.0}
+
+    def timed(stage, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        stages[stage] += time.perf_counter() - start
+        return result
+
+    if mode == 0:
+        cluster = timed('predict', run.predict_cluster, user_info, CLTH.TOP)
+        if timed('match', run.best_outfits, cluster, clothes_attributes):
+            return stages
+        df_sorted = timed('sort', run.ranked_cluster_data, cluster, "상의")
+        ret, top_clothes = timed('match', clothes_main.pick_cloth, df_sorted, user_info, clothes_attributes, "상의")
+        if ret:
+            top_clothes = top_clothes[:-1]
+            cluster = timed('predict', run.predict_cluster, user_info, top_clothes, CLTH.BOTTOM)
+            df_sorted = timed('sort', run.ranked_cluster_data, cluster, "하의")
+            timed('match', clothes_main.pick_bottom_for_top, df_sorted, user_info, clothes_attributes, top_clothes)
+        return stages
+
+    type = "상의" if mode == 1 else "하의"
+    args = (user_info, CLTH.TOP) if selected_info is None else (user_info, selected_info, CLTH.TOP)
+    cluster = timed('predict', run.predict_cluster, *args)
+    df_sorted = timed('sort', run.ranked_cluster_data, cluster, type)
+    timed('match', clothes_main.pick_cloth, df_sorted, user_info, clothes_attributes, type)
+    return stages
+
+
+def bench_mode(contexts, user_clothes, mode, batch=False):
+    clothes_attributes = clothes_main.get_clothes_attributes(user_clothes)
+    latencies = []
+    stages = {'predict': [], 'sort': [], 'match': []}
+    requests = [args_of(row, mode) for _, row in contexts.iterrows()]
+
+    # 끝에서 끝까지 지연 시간 (main() 의 출력은 버림)
+    start_all = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for user_info, selected_info in requests:
+            start = time.perf_counter()
+            clothes_main.main(*user_info, mode, selected_info, user_clothes)
+            latencies.append(time.perf_counter() - start)
+    elapsed = time.perf_counter() - start_all
+
+    # 단계별 시간
+    for user_info, selected_info in requests:
+        for stage, seconds in time_stages(user_info, selected_info, clothes_attributes, mode).items():
+            stages[stage].append(seconds)
+
+    result = {**summarize(latencies), 'throughput_rps': len(requests) / elapsed if elapsed else None,
+              'stages': {stage: summarize(seconds) for stage, seconds in stages.items()}}
+
+    # 묶음 추천 처리량 (main_batch, 현재 프로세스)
+    if batch:
+        start = time.perf_counter()
+        clothes_main.main_batch([user_info for user_info, _ in requests], [user_clothes] * len(requests), mode,
+                                [selected_info for _, selected_info in requests], max_workers=1)
+        batch_elapsed = time.perf_counter() - start
+        result['batch_throughput_rps'] = len(requests) / batch_elapsed if batch_elapsed else None
+    return result
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # 리눅스는 KB, macOS 는 바이트 단위
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def benchmark(opt):
+    if opt.trace_memory:
+        tracemalloc.start()
+
+    start = time.perf_counter()
+    recommender = run.get_recommender()
+    load_seconds = time.perf_counter() - start
+
+    contexts = load_contexts(opt.contexts, opt.limit, opt.seed)
+    with open(opt.closet, 'r', encoding='utf-8') as file:
+        base_closet = json.load(file)
+
+    # 첫 요청의 지연(지연 로딩, 캐시 준비)이 결과에 섞이지 않도록 몇 번 미리 실행
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _, row in contexts.head(opt.warmup).iterrows():
+            for mode in opt.modes:
+                user_info, selected_info = args_of(row, mode)
+                clothes_main.main(*user_info, mode, selected_info, base_closet)
+
+    results = []
+    for size in opt.closet_sizes:
+        user_clothes = base_closet if size == 0 else synthesize_closet(recommender.df, size, opt.seed)
+        for mode in opt.modes:
+            print(f"closet={len(user_clothes)} mode={modes[mode]} ...", file=sys.stderr)
+            results.append({'closet_size': len(user_clothes), 'synthetic': size != 0, 'mode': modes[mode],
+                            'recommend_select': mode, **bench_mode(contexts, user_clothes, mode, opt.batch)})
+
+    report = {
+        'config': {'contexts': opt.contexts, 'closet': opt.closet, 'limit': len(contexts), 'seed': opt.seed,
+                   'warmup': opt.warmup, 'closet_sizes': opt.closet_sizes, 'modes': opt.modes},
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                        'numpy': np.__version__, 'pandas': pd.__version__},
+        'model_load_seconds': load_seconds,
+        'results': results,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+    if opt.trace_memory:
+        report['peak_traced_mb'] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+    return report
+
+
+def parse_opt():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--contexts', default='clothes_kmodes/datasets/user_info.csv', help='재생할 사용자/날씨 조건 csv')
+    parser.add_argument('--closet', default=cfg.json_path, help='기본 옷장 json')
+    parser.add_argument('--limit', type=int, default=1000, help='재생할 조건 수 (임의 추출)')
+    parser.add_argument('--closet-sizes', type=int, nargs='+', default=[0, 100, 1000],
+                        help='옷장 크기 목록 (0 은 기본 옷장, 그 외는 합성 옷장)')
+    parser.add_argument('--modes', type=int, nargs='+', default=[0, 1, 2], help='recommend_select 목록')
+    parser.add_argument('--warmup', type=int, default=5, help='측정 전에 미리 실행할 조건 수')
+    parser.add_argument('--seed', type=int, default=0, help='조건 추출/합성 옷장 시드')
+    parser.add_argument('--batch', action='store_true', help='main_batch 처리량도 측정')
+    parser.add_argument('--trace-memory', action='store_true', help='tracemalloc 으로 파이썬 할당 최대치 측정 (느려짐)')
+    parser.add_argument('--output', default=None, help='결과 JSON 저장 경로 (없으면 표준 출력)')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    opt = parse_opt()
+    report = benchmark(opt)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if opt.output:
+        with open(opt.output, 'w', encoding='utf-8') as file:
+            file.write(text)
+    else:
+        print(text)
@@ -16,4 +16,7 @@ config = read_yaml(yaml_file_path)
 kproto_model_path = config.paths.kproto_model_path
 final_result_path = config.paths.final_result_path
 final_result_with_cluster_path = config.paths.final_result_with_cluster_path
+cluster_table_path = config.paths.cluster_table_path
+cluster_ranking_path = config.paths.cluster_ranking_path
+cluster_cooccurrence_path = config.paths.cluster_cooccurrence_path
 json_path = config.paths.json_path
\ No newline at end of file
@@ -1,38 +1,117 @@
-import numpy as np
-import pandas as pd
+import argparse
 
-# CSV 파일 경로 설정
-weather_csv_path = r"D:\Development\Pycharm Projects\FashionPeople\datasets\musinsa_weather.csv"
-musinsa_feature_csv_path = r"D:\Development\Pycharm Projects\FashionPeople\datasets\musinsa_result_1.csv"
+import pandas as pd
 
 # 필요한 컬럼들 정의
 final_col = ["나이", "성별", "스타일", "일 평균 기온", "일 평균 기상", "일 평균 습도", "일 평균 풍속",
              "상의 카테고리", "상의 색상", "상의 기장", "상의 소재", "상의 프린트",
              "하의 카테고리", "하의 색상", "하의 기장", "하의 소재", "하의 프린트"]
 
-# CSV 데이터 로드
-weather_data = pd.read_csv(weather_csv_path)
-feature_data = pd.read_csv(musinsa_feature_csv_path)
+# 수치형 컬럼 (나머지 최종 컬럼은 모든 chunk 에서 문자열로 읽음)
+numerical_cols = ["일 평균 기온", "일 평균 습도", "일 평균 풍속"]
+text_dtypes = {col: str for col in final_col if col not in numerical_cols}
+
+"""
+무신사 특징 CSV + 날씨 CSV -> 학습용 final_result.csv
+- 특징 CSV 는 chunk_size 행씩 읽고, 작은 날씨 테이블은 한 번만 읽어서 chunk 마다 해시 조인
+- 1차 패스: 조인 결과의 결측값 대체 통계(수치형 평균, 문자열 열 최빈값)만 누적
+- 2차 패스: 다시 조인하면서 결측값을 채우고 결과를 chunk 단위로 이어서 저장
+  (메모리는 chunk 크기와 날씨 테이블 크기에만 비례)
+
+예) python clothes_kmodes/datasets/final_musinsa_dataset.py --features musinsa_result_1.csv --output final_result.csv
+"""
+
+
+def load_weather(paths, encoding):
+    # 날씨 테이블 (조인 키 '이미지 파일명' + 최종 컬럼만)
+    frames = [pd.read_csv(path, encoding=encoding, dtype=text_dtypes,
+                          usecols=lambda col: col == '이미지 파일명' or col in final_col)
+              for path in paths]
+    return pd.concat(frames, ignore_index=True)
+
+
+def read_features(path, chunk_size, encoding):
+    # 특징 CSV 를 chunk 단위로 읽음 ('파일명' + 최종 컬럼만)
+    return pd.read_csv(path, encoding=encoding, chunksize=chunk_size, dtype=text_dtypes,
+                       usecols=lambda col: col == '파일명' or col in final_col)
+
+
+def join_chunk(features, weather):
+    # 파일명에서 마지막 요소 추출 (벡터화된 문자열 연산) 후 날씨 테이블과 병합
+    features = features.assign(파일명_추출=features['파일명'].str.rsplit('/', n=1).str[-1])
+    return features.merge(weather, left_on='파일명_추출', right_on='이미지 파일명', suffixes=('', '_weather'))
+
+
+class FillStats:
+    """
+    결측값 대체 통계를 chunk 단위로 누적
+    - 수치형 열: 합계와 개수 -> 평균
+    - 문자열 열(수치형이 아닌 최종 컬럼, 모든 chunk 에서 str 로 읽음): 값별 개수 -> 최빈값
+      (동률이면 pandas mode 처럼 정렬 순서상 첫 값)
+    """
+
+    def __init__(self):
+        self.sums = {}
+        self.counts = {}
+        self.value_counts = {}
+
+    def update(self, merged):
+        for col in final_col:
+            if col not in merged.columns:
+                continue
+            values = merged[col]
+            if col in numerical_cols:
+                self.sums[col] = self.sums.get(col, 0.0) + values.sum()
+                self.counts[col] = self.counts.get(col, 0) + values.count()
+            else:
+                counts = values.dropna().astype(str).value_counts()
+                self.value_counts[col] = counts if col not in self.value_counts else \
+                    self.value_counts[col].add(counts, fill_value=0)
+
+    def fill_values(self):
+        fill = {}
+        for col, counts in self.value_counts.items():
+            if len(counts):
+                fill[col] = sorted(counts[counts == counts.max()].index)[0]
+        for col, count in self.counts.items():
+            if count:
+                fill[col] = self.sums[col] / count
+        return fill
+
+
+def build(opt):
+    weather = load_weather(opt.weather, opt.encoding)
+
+    # 1차 패스: 결측값 대체 통계
+    stats = FillStats()
+    for features in read_features(opt.features, opt.chunk_size, opt.encoding):
+        stats.update(join_chunk(features, weather))
+    fill = stats.fill_values()
 
-# feature_data에서 파일명에서 마지막 요소 추출
-feature_data['파일명_추출'] = feature_data['파일명'].apply(lambda x: x.split('/')[-1])
+    # 2차 패스: 결측값 처리 후 필요한 컬럼만 chunk 단위로 저장
+    written = 0
+    for features in read_features(opt.features, opt.chunk_size, opt.encoding):
+        final_data = join_chunk(features, weather).fillna(fill)[final_col]
+        final_data.to_csv(opt.output, mode='w' if written == 0 else 'a', header=written == 0, index=False)
+        written += len(final_data)
+        print(f"{written}개 행 저장")
 
-# weather_data에서 파일명과 비교하여 병합
-merged_data = feature_data.merge(weather_data, left_on='파일명_추출', right_on='이미지 파일명', suffixes=('', '_weather'))
+    if written == 0:
+        pd.DataFrame(columns=final_col).to_csv(opt.output, index=False)
+    print("CSV 파일이 성공적으로 생성되었습니다.")
 
-# 결측값 처리: 수치형 열의 결측값은 평균값으로, 범주형 열의 결측값은 최빈값으로 대체
-for col in final_col:
-    if col in merged_data.columns:
-        if merged_data[col].dtype == 'O':  # 범주형 데이터
-            merged_data[col].fillna(merged_data[col].mode()[0], inplace=True)
-        else:  # 수치형 데이터
-            merged_data[col].fillna(merged_data[col].mean(), inplace=True)
 
-# 필요한 컬럼 선택
-final_data = merged_data[final_col]
+def parse_opt():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--weather', nargs='+',
+                        default=['clothes_kmodes/datasets/musinsa_men_weather.csv',
+                                 'clothes_kmodes/datasets/musinsa_women_weather.csv'], help='날씨 CSV (여러 개 가능)')
+    parser.add_argument('--features', default='clothes_kmodes/datasets/musinsa_result_1.csv', help='무신사 특징 CSV')
+    parser.add_argument('--output', default='clothes_kmodes/datasets/final_result.csv', help='저장할 CSV 경로')
+    parser.add_argument('--chunk-size', type=int, default=100000, help='한 번에 읽을 특징 CSV 행 수')
+    parser.add_argument('--encoding', default='utf-8-sig', help='입력 CSV 인코딩 (BOM 유무 모두 처리)')
+    return parser.parse_args()
 
-# 새로운 CSV 파일로 저장
-final_csv_path = r"D:\Development\Pycharm Projects\FashionPeople\datasets\final_result.csv"
-final_data.to_csv(final_csv_path, index=False)
 
-print("CSV 파일이 성공적으로 생성되었습니다.")
+if __name__ == "__main__":
+    build(parse_opt())
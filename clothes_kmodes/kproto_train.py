@@ -1,10 +1,18 @@
+import argparse
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
 from kmodes.kprototypes import KPrototypes
+from kmodes.util import encode_features
 import joblib
 import config.config as cfg
-
-# 데이터 로드
-df = pd.read_csv(cfg.final_result_path)
+from utils.cluster_ranking import build_rankings, save_rankings
+from utils.cluster_table import save_table
+from utils.cooccurrence import CooccurrenceTable
+from utils.kproto_kernel import KPrototypesKernel
 
 # 범주형과 수치형 컬럼 분리
 categorical_cols = ['나이', '성별', '스타일', '일 평균 기상',
@@ -13,35 +21,188 @@ categorical_cols = ['나이', '성별', '스타일', '일 평균 기상',
 
 numerical_cols = ['일 평균 기온', '일 평균 습도', '일 평균 풍속']
 
-# 범주형과 수치형 컬럼 인덱스 확인
-categorical_cols_indices = [df.columns.get_loc(col) for col in categorical_cols]
-
-# 클러스터의 수를 줄이고, 초기화 방법을 'Cao'로 변경하며, 초기화 시도 횟수를 증가
-kproto = KPrototypes(n_clusters=20, init='Cao', n_init=10, verbose=2)
-clusters = kproto.fit_predict(df, categorical=categorical_cols_indices)
-print(clusters)
-
-# 클러스터 할당 결과
-df['Cluster'] = clusters
-
-# 학습된 모델 저장
-model_path = cfg.kproto_model_path
-joblib.dump(kproto, model_path)
-print("모델이 성공적으로 학습되고 저장되었습니다.")
-
-# 클러스터가 추가된 데이터프레임 저장
-final_result_with_clusters_path = cfg.final_result_with_cluster_path
-df.to_csv(final_result_with_clusters_path, index=False)
-print("클러스터가 추가된 데이터프레임이 성공적으로 저장되었습니다.")
-
-# 클러스터별 데이터 출력 및 개수 확인
-for cluster in range(kproto.n_clusters):
-    cluster_data = df[df['Cluster'] == cluster]
-    print(f"클러스터 {cluster}의 데이터 ({len(cluster_data)}개):")
-    print(cluster_data)
-    print("\n")  # 클러스터별로 구분하기 위해 줄바꿈 추가
-
-# 각 클러스터에 속하는 데이터의 개수 출력
-cluster_counts = df['Cluster'].value_counts().sort_index()
-print("각 클러스터에 속하는 데이터의 개수:")
-print(cluster_counts)
+# 층화 샘플링 기준 컬럼
+strata_cols = ['나이', '성별', '스타일']
+
+
+def encode(df, categorical_cols_indices):
+    """
+    범주형 값을 한 번만 정수 코드로 변환 (k 값, 재시작마다 다시 인코딩하지 않도록)
+    - 반환 값: (float64 배열, 컬럼별 {원래 값: 코드})
+    """
+    X = df.to_numpy(dtype=object)
+    codes, enc_map = encode_features(X[:, categorical_cols_indices])
+    X_enc = X.copy()
+    X_enc[:, categorical_cols_indices] = codes
+    return X_enc.astype(np.float64), enc_map
+
+
+def restore_categories(kproto, enc_map):
+    # 코드로 학습한 모델이 원래 범주형 값을 입력받도록 인코딩 맵을 (원래 값 -> 모델 내부 코드)로 교체
+    kproto._enc_map = [{value: fitted[float(code)] for value, code in original.items() if float(code) in fitted}
+                       for original, fitted in zip(enc_map, kproto._enc_map)]
+    return kproto
+
+
+def stratified_sample(df, frac, seed):
+    # 나이/성별/스타일 비율을 유지한 샘플의 행 위치
+    positions = pd.Series(np.arange(len(df)), index=df.index)
+    sample = positions.groupby([df[col] for col in strata_cols], group_keys=False).apply(
+        lambda group: group.sample(frac=frac, random_state=seed) if len(group) > 1 else group)
+    return np.sort(sample.to_numpy())
+
+
+def fit_once(X, categorical_cols_indices, n_clusters, init, gamma, max_iter, seed):
+    # 재시작 한 번 (n_init=1)
+    kproto = KPrototypes(n_clusters=n_clusters, init=init, n_init=1, gamma=gamma, max_iter=max_iter,
+                         random_state=int(seed))
+    kproto.fit(X, categorical=categorical_cols_indices)
+    return kproto
+
+
+def _fit_once(args):
+    return fit_once(*args)
+
+
+def checkpoint_digest(X, enc_map, init, max_iter, gamma):
+    # 학습 데이터, 인코딩 맵, 학습 설정이 하나라도 다르면 다른 체크포인트가 되도록 해시
+    digest = hashlib.sha1(np.ascontiguousarray(X).tobytes())
+    digest.update(repr((enc_map, init, max_iter, float(gamma))).encode('utf-8'))
+    return digest.hexdigest()[:12]
+
+
+def fit_restarts(X, categorical_cols_indices, n_clusters, opt, enc_map):
+    """
+    n_init 번의 재시작을 프로세스 풀에서 동시에 실행하고 비용이 가장 낮은 모델을 반환
+    - checkpoint_dir 가 있으면 끝난 재시작을 저장하고, 다시 실행하면 저장된 재시작은 건너뜀
+    - 체크포인트 이름에 데이터/인코딩 맵/init/max_iter/gamma 해시를 넣어서 다른 설정의 체크포인트는 쓰지 않음
+    """
+    gamma = 0.5 * np.mean(np.delete(X, categorical_cols_indices, axis=1).std(axis=0))
+    seeds = np.random.RandomState(opt.seed).randint(np.iinfo(np.int32).max, size=opt.n_init)
+    digest = checkpoint_digest(X, enc_map, opt.init, opt.max_iter, gamma) if opt.checkpoint_dir else None
+
+    def checkpoint_path(init_no):
+        if not opt.checkpoint_dir:
+            return None
+        name = f"k{n_clusters}_seed{opt.seed}_frac{opt.sample_frac}_{digest}_init{init_no}.joblib"
+        return os.path.join(opt.checkpoint_dir, name)
+
+    models = {}
+    todo = []
+    for init_no, seed in enumerate(seeds):
+        path = checkpoint_path(init_no)
+        if path and os.path.exists(path):
+            models[init_no] = joblib.load(path)
+            print(f"k={n_clusters} 재시작 {init_no + 1}/{opt.n_init}: 체크포인트 사용 (비용 {models[init_no].cost_:.2f})")
+        else:
+            todo.append(init_no)
+
+    jobs = [(X, categorical_cols_indices, n_clusters, opt.init, gamma, opt.max_iter, seeds[init_no]) for init_no in todo]
+    with ProcessPoolExecutor(max_workers=opt.n_jobs) as pool:
+        for init_no, kproto in zip(todo, pool.map(_fit_once, jobs)):
+            models[init_no] = kproto
+            if checkpoint_path(init_no):
+                joblib.dump(kproto, checkpoint_path(init_no))
+            print(f"k={n_clusters} 재시작 {init_no + 1}/{opt.n_init}: 비용 {kproto.cost_:.2f}")
+
+    best = min(models, key=lambda init_no: models[init_no].cost_)
+    return models[best]
+
+
+def sweep(X, categorical_cols_indices, opt, enc_map):
+    # 같은 인코딩 데이터로 여러 클러스터 수를 학습해서 비용 비교
+    costs = {k: fit_restarts(X, categorical_cols_indices, k, opt, enc_map).cost_ for k in opt.sweep}
+    print("클러스터 수별 비용:")
+    for k, cost in costs.items():
+        print(f"  k={k}: {cost:.2f}")
+    return costs
+
+
+def train(opt):
+    # 데이터 로드
+    df = pd.read_csv(opt.data)
+
+    # 범주형과 수치형 컬럼 인덱스 확인
+    categorical_cols_indices = [df.columns.get_loc(col) for col in categorical_cols]
+    X, enc_map = encode(df, categorical_cols_indices)
+
+    # 층화 샘플로 학습하고 전체 데이터는 마지막에 한 번에 할당
+    if opt.sample_frac < 1:
+        X_fit = X[stratified_sample(df, opt.sample_frac, opt.seed)]
+        print(f"층화 샘플 {len(X_fit)}/{len(X)}개로 학습합니다.")
+    else:
+        X_fit = X
+
+    if opt.checkpoint_dir:
+        os.makedirs(opt.checkpoint_dir, exist_ok=True)
+
+    if opt.sweep:
+        return sweep(X_fit, categorical_cols_indices, opt, enc_map)
+
+    # 'Cao' 초기화, 재시작 n_init 번 (기본값: 클러스터 20개, 재시작 10번)
+    kproto = restore_categories(fit_restarts(X_fit, categorical_cols_indices, opt.n_clusters, opt, enc_map),
+                                enc_map)
+
+    # 클러스터 할당 결과 (전체 데이터, kproto.predict 와 같은 결과)
+    clusters = KPrototypesKernel(kproto, categorical_cols_indices).predict(df.to_numpy(dtype=object))
+    print(clusters)
+    df['Cluster'] = clusters
+
+    # 학습된 모델 저장
+    joblib.dump(kproto, opt.model)
+    print("모델이 성공적으로 학습되고 저장되었습니다.")
+
+    # 클러스터가 추가된 데이터프레임 저장
+    df.to_csv(opt.output, index=False)
+    print("클러스터가 추가된 데이터프레임이 성공적으로 저장되었습니다.")
+
+    # 서빙용 바이너리 테이블 저장 (정수 코드 범주형 + float32 수치형)
+    save_table(opt.table, df, categorical_cols)
+    print("클러스터 테이블 바이너리가 성공적으로 저장되었습니다.")
+
+    # 클러스터별 상의/하의 빈도수 정렬 순서 저장 (서빙 시 매 요청마다 정렬하지 않도록)
+    save_rankings(opt.ranking, build_rankings(df))
+    print("클러스터별 정렬 순서가 성공적으로 저장되었습니다.")
+
+    # 클러스터별 상의 x 하의 (카테고리, 색상) 동시 등장 횟수 저장 (전체 추천의 상의/하의 동시 선택용)
+    CooccurrenceTable.build(df).save(opt.cooccurrence)
+    print("클러스터별 상의/하의 동시 등장 횟수가 성공적으로 저장되었습니다.")
+
+    # 클러스터별 데이터 출력 및 개수 확인
+    if opt.verbose:
+        for cluster in range(kproto.n_clusters):
+            cluster_data = df[df['Cluster'] == cluster]
+            print(f"클러스터 {cluster}의 데이터 ({len(cluster_data)}개):")
+            print(cluster_data)
+            print("\n")  # 클러스터별로 구분하기 위해 줄바꿈 추가
+
+    # 각 클러스터에 속하는 데이터의 개수 출력
+    cluster_counts = df['Cluster'].value_counts().sort_index()
+    print("각 클러스터에 속하는 데이터의 개수:")
+    print(cluster_counts)
+    return kproto
+
+
+def parse_opt():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data', default=cfg.final_result_path, help='학습 데이터 csv')
+    parser.add_argument('--model', default=cfg.kproto_model_path, help='모델 저장 경로')
+    parser.add_argument('--output', default=cfg.final_result_with_cluster_path, help='클러스터가 추가된 csv 저장 경로')
+    parser.add_argument('--table', default=cfg.cluster_table_path, help='서빙용 바이너리 클러스터 테이블 저장 경로')
+    parser.add_argument('--ranking', default=cfg.cluster_ranking_path, help='클러스터별 정렬 순서 저장 경로')
+    parser.add_argument('--cooccurrence', default=cfg.cluster_cooccurrence_path, help='상의/하의 동시 등장 횟수 저장 경로')
+    parser.add_argument('--n-clusters', type=int, default=20, help='클러스터 수')
+    parser.add_argument('--init', default='Cao', help='초기화 방법 (Cao, Huang, random)')
+    parser.add_argument('--n-init', type=int, default=10, help='재시작 횟수')
+    parser.add_argument('--max-iter', type=int, default=100, help='재시작 당 최대 반복 횟수')
+    parser.add_argument('--n-jobs', type=int, default=None, help='동시에 실행할 재시작 수 (기본값: CPU 수)')
+    parser.add_argument('--seed', type=int, default=0, help='재시작/샘플링 시드')
+    parser.add_argument('--sample-frac', type=float, default=1.0, help='학습에 쓸 층화 샘플 비율 (1 이면 전체 데이터)')
+    parser.add_argument('--checkpoint-dir', default=None, help='재시작 체크포인트 저장 폴더')
+    parser.add_argument('--sweep', type=int, nargs='+', default=None, help='비용을 비교할 클러스터 수 목록 (모델은 저장하지 않음)')
+    parser.add_argument('--verbose', action='store_true', help='클러스터별 데이터 출력')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    train(parse_opt())
@@ -1,167 +1,183 @@
 from clothes_kmodes.server_api import run
+from clothes_kmodes.utils.closet_scoring import ClusterProfile
 import clothes_kmodes.clothes_enum as CLTH
 import clothes_kmodes.config.config as cfg
 import json
-import os
-from joblib import load
+from concurrent.futures import ProcessPoolExecutor
 
-# 현재 파일의 디렉토리 경로를 기준으로 모델 경로 설정
-base_dir = os.path.dirname(os.path.abspath(__file__))
-model_path = os.path.join(base_dir, 'datasets/kproto_model.joblib')
+import pandas as pd
 
-# 모델 로드
-try:
-    model = load(model_path)
-except FileNotFoundError:
+"""
+user_info에 값을 넣을때는 "나이, 성별, 스타일, 일 평균 기온, 일 평균 기상, 일 평균 습도, 일 평균 풍속" 순서를 지켜서
+"""
 
+
+# 옷장 속성 테이블 컬럼 (main 에서 만드는 clothes_attributes 의 순서)
+closet_columns = ['type', 'color', 'length', 'material', 'printing', 'id']
+
+
+def user_mask(df_sorted, user_info):
+    # 나이/성별/스타일이 같은 행
+    return (df_sorted["나이"] == user_info[0]) & (df_sorted["성별"] == user_info[1]) & (df_sorted["스타일"] == user_info[2])
+
+
+def match_closet(df_sorted, user_info, clothes_attributes, type, match_color=True, condition=None):
     """
-    user_info에 값을 넣을때는 "나이, 성별, 스타일, 일 평균 기온, 일 평균 기상, 일 평균 습도, 일 평균 풍속" 순서를 지켜서
+    나이/성별/스타일이 같은 행 중 (카테고리, 색상) 또는 카테고리가 옷장 옷과 일치하는 행을 조인으로 찾음
+    기존 반복문과 같은 결과: 정렬 순서상 일치하는 마지막 행과, 그 행과 일치하는 옷장의 첫 번째 옷
     """
+    mask = user_mask(df_sorted, user_info)
+    if condition is not None:
+        mask &= condition
+    left_on = [f"{type} 카테고리", f"{type} 색상"] if match_color else [f"{type} 카테고리"]
+    right_on = ['type', 'color'] if match_color else ['type']
+
+    closet = pd.DataFrame(clothes_attributes, columns=closet_columns)
+    closet = closet.drop_duplicates(subset=right_on, keep='first')[right_on + ['id']]
+    matched = df_sorted[mask].merge(closet, how='inner', left_on=left_on, right_on=right_on, sort=False)
+    if matched.empty:
+        return None
+    return matched.iloc[-1]
 
 
-def data_sort(clothes, type):
-    # 데이터 정렬
-    # '상의 카테고리'와 '상의 색상'의 빈도수를 계산하여 데이터 프레임에 추가
-    category_counts = clothes[f'{type} 카테고리'].value_counts()
-    color_counts = clothes[f'{type} 색상'].value_counts()
+def matched_result(cloth, type):
+    return (cloth[f"{type} 색상"], cloth[f"{type} 프린트"], cloth[f"{type} 소재"], cloth[f"{type} 기장"],
+            cloth[f"{type} 카테고리"], cloth["id"])
 
-    clothes['category_count'] = clothes[f'{type} 카테고리'].map(category_counts)
-    clothes['color_count'] = clothes[f'{type} 색상'].map(color_counts)
 
-    # 빈도수 기준으로 정렬
-    df_sorted = clothes.sort_values(by=['category_count', 'color_count'], ascending=[False, False]).drop(
-        columns=['category_count', 'color_count'])
+def pick_cloth(df_sorted, user_info, clothes_attributes, type):
+    # (카테고리, 색상) 일치 -> 없으면 카테고리만 일치
+    cloth = match_closet(df_sorted, user_info, clothes_attributes, type)
+    if cloth is None:
+        cloth = match_closet(df_sorted, user_info, clothes_attributes, type, match_color=False)
+    if cloth is None:
+        return False, None
+    return True, matched_result(cloth, type)
 
-    return df_sorted
+
+def pick_bottom_for_top(df_sorted, user_info, clothes_attributes, top_clothes):
+    # 선택된 상의와 (카테고리, 색상)이 같은 행 중 하의가 옷장과 일치하는 행
+    same_top = (df_sorted["상의 카테고리"] == top_clothes[4]) & (df_sorted["상의 색상"] == top_clothes[0])
+    return match_closet(df_sorted, user_info, clothes_attributes, "하의", condition=same_top)
 
 
 def top_recommend(user_info, clothes_attributes, selected_info):
+    # 빈도수 순으로 미리 정렬된 클러스터 데이터
     if selected_info == None:
-        top_clothes = run.predict(user_info, CLTH.TOP)
+        df_sorted = run.predict_ranked("상의", user_info, CLTH.TOP)
     else:
-        top_clothes = run.predict(user_info, selected_info, CLTH.TOP)
-
-    # 데이터 정렬
-    df_sorted = data_sort(top_clothes, "상의")
-    print(df_sorted)
-    try:
-        for cloth in df_sorted.iloc:
-            if cloth["나이"] == user_info[0] and cloth["성별"] == user_info[1] and cloth["스타일"] == user_info[2]:
-                for attributes in clothes_attributes:
-                    if cloth["상의 카테고리"] == attributes[0] and cloth["상의 색상"] == attributes[1]:  # and cloth["상의 기장"] == attributes[2] and cloth["상의 소재"] == attributes[3] and cloth["상의 프린트"] == attributes[4]:
-                        top_id = attributes[5]
-                        top_color = cloth["상의 색상"]
-                        top_print = cloth["상의 프린트"]
-                        top_material = cloth["상의 소재"]
-                        top_length = cloth["상의 기장"]
-                        top_category = cloth["상의 카테고리"]
-                        break
-
-        return True, (top_color, top_print, top_material, top_length, top_category, top_id)
-    except:
-        try:
-            for cloth in df_sorted.iloc:
-                if cloth["나이"] == user_info[0] and cloth["성별"] == user_info[1] and cloth["스타일"] == user_info[2]:
-                    for attributes in clothes_attributes:
-                        if cloth["상의 카테고리"] == attributes[0]:
-                            top_id = attributes[5]
-                            top_color = cloth["상의 색상"]
-                            top_print = cloth["상의 프린트"]
-                            top_material = cloth["상의 소재"]
-                            top_length = cloth["상의 기장"]
-                            top_category = cloth["상의 카테고리"]
-                            break
-
-            return True, (top_color, top_print, top_material, top_length, top_category, top_id)
-        except:
-            return False, None
+        df_sorted = run.predict_ranked("상의", user_info, selected_info, CLTH.TOP)
+
+    return pick_cloth(df_sorted, user_info, clothes_attributes, "상의")
 
 
 def bottom_recommend(user_info, clothes_attributes, selected_info):
     # 하의 추천
     #bottom_clothes = run.predict(user_info, selected_info, CLTH.BOTTOM)
 
+    # 빈도수 순으로 미리 정렬된 클러스터 데이터
     if selected_info == None:
-        bottom_clothes = run.predict(user_info, CLTH.TOP)
+        df_sorted = run.predict_ranked("하의", user_info, CLTH.TOP)
     else:
-        bottom_clothes = run.predict(user_info, selected_info, CLTH.TOP)
-
-    # 데이터 정렬
-    df_sorted = data_sort(bottom_clothes, "하의")
-
-    try:
-        for cloth in df_sorted.iloc:
-            if cloth["나이"] == user_info[0] and cloth["성별"] == user_info[1] and cloth["스타일"] == user_info[2]:
-                for attributes in clothes_attributes:
-                    if cloth["하의 카테고리"] == attributes[0] and cloth["하의 색상"] == attributes[1]:  # and cloth["하의 기장"] == attributes[2] and cloth["하의 소재"] == attributes[3] and cloth["하의 프린트"] == attributes[4]:
-                        bottom_id = attributes[5]
-                        bottom_color = cloth["하의 색상"]
-                        bottom_print = cloth["하의 프린트"]
-                        bottom_material = cloth["하의 소재"]
-                        bottom_length = cloth["하의 기장"]
-                        bottom_category = cloth["하의 카테고리"]
-                        break
-
-        return True, (bottom_color, bottom_print, bottom_material, bottom_length, bottom_category, bottom_id)
-    except:
-        try:
-            for cloth in df_sorted.iloc:
-                if cloth["나이"] == user_info[0] and cloth["성별"] == user_info[1] and cloth["스타일"] == user_info[2]:
-                    for attributes in clothes_attributes:
-                        if cloth["하의 카테고리"] == attributes[0]:
-                            bottom_id = attributes[5]
-                            bottom_color = cloth["하의 색상"]
-                            bottom_print = cloth["하의 프린트"]
-                            bottom_material = cloth["하의 소재"]
-                            bottom_length = cloth["하의 기장"]
-                            bottom_category = cloth["하의 카테고리"]
-                            break
-
-            return True, (bottom_color, bottom_print, bottom_material, bottom_length, bottom_category, bottom_id)
-        except:
-            return False, None
+        df_sorted = run.predict_ranked("하의", user_info, selected_info, CLTH.TOP)
+
+    return pick_cloth(df_sorted, user_info, clothes_attributes, "하의")
 
 
 def both_recommend(user_info, clothes_attributes):
+    # 클러스터의 상의 x 하의 동시 등장 횟수로 옷장의 모든 (상의, 하의) 쌍을 한 번에 점수화
+    cluster = run.predict_cluster(user_info, CLTH.TOP)
+    outfits = run.best_outfits(cluster, clothes_attributes)
+    if outfits:
+        top_id, bottom_id, _ = outfits[0]
+        return top_id, bottom_id
+
+    # 함께 등장한 쌍이 없으면 상의를 먼저 고르고 그 상의에 맞는 하의를 고름
+    return greedy_both_recommend(user_info, clothes_attributes)
+
+
+def greedy_both_recommend(user_info, clothes_attributes):
     ret, top_clothes = top_recommend(user_info, clothes_attributes, None)
     if ret:
         top_id = top_clothes[-1]
         top_clothes = top_clothes[:-1]
-        try:
-            bottom_clothes = run.predict(user_info, top_clothes, CLTH.BOTTOM)
-            # 데이터 정렬
-            df_sorted = data_sort(bottom_clothes, "하의")
-
-            for cloth in df_sorted.iloc:
-                if cloth["나이"] == user_info[0] and cloth["성별"] == user_info[1] and cloth["스타일"] == user_info[2]:
-                    for attributes in clothes_attributes:
-                        if cloth["상의 카테고리"] == top_clothes[4] and cloth["상의 색상"] == top_clothes[0]:
-                            # print(cloth)
-                            if cloth["하의 카테고리"] == attributes[0] and cloth["하의 색상"] == attributes[1]:  # and cloth["하의 기장"] == attributes[2] and cloth["하의 소재"] == attributes[3] and cloth["하의 프린트"] == attributes[4]:
-                                bottom_id = attributes[5]
-                                bottom_color = cloth["하의 색상"]
-                                bottom_print = cloth["하의 프린트"]
-                                bottom_material = cloth["하의 소재"]
-                                bottom_length = cloth["하의 기장"]
-                                bottom_category = cloth["하의 카테고리"]
-                                break
-
-            print(bottom_color, bottom_print, bottom_material, bottom_length, bottom_category, bottom_id)
-            return top_id, bottom_id
-        except:
+        # 빈도수 순으로 미리 정렬된 클러스터 데이터
+        df_sorted = run.predict_ranked("하의", user_info, top_clothes, CLTH.BOTTOM)
+
+        cloth = pick_bottom_for_top(df_sorted, user_info, clothes_attributes, top_clothes)
+        if cloth is None:
             return top_id, "하의 없음"
+
+        print(*matched_result(cloth, "하의"))
+        return top_id, cloth["id"]
     else:
         return "상의 없음", "하의 없음"
 
 
+def get_clothes_attributes(user_clothes):
+    # 각 항목의 필요한 필드를 추출하여 2차원 배열로 저장
+    return [[item['type'], item['color'], item['length'], item['material'], item['printing'], item['id']]
+            for item in user_clothes]
+
+
+def rank_closet(df_sorted, user_info, clothes_attributes, type, k, condition=None):
+    """
+    클러스터 데이터의 속성별 빈도 분포로 옷장 전체를 점수화해서 상위 k 개 (id, 점수) 반환
+    - 분포는 나이/성별/스타일(+condition)이 같은 행에서 계산하고, 그런 행이 없으면 조건을 하나씩 풀어서 계산
+    """
+    mask = user_mask(df_sorted, user_info)
+    for rows in ([df_sorted[mask & condition]] if condition is not None else []) + [df_sorted[mask], df_sorted]:
+        if len(rows):
+            return ClusterProfile(rows, type).top_k(clothes_attributes, k)
+    return []
+
+
+def main_top_k(age, sex, style, temperatures, weather, humidity, wind_speed, recommend_select, selected_info,
+               user_clothes, k=5):
+    """
+    main() 과 같은 입력으로 옷장 후보를 점수 순으로 k 개씩 반환 ("다른 옷 보기" 용)
+    - 상의/하의 추천: [(id, 점수), ...] (1순위는 main() 이 고른 옷, 나머지는 점수 순)
+    - 전체 추천: [(상의 id, 하의 id, 동시 등장 횟수), ...] (both_recommend 와 같은 순서라서 1순위는 main() 결과와 같음)
+      함께 등장한 쌍이 없으면 main() 과 같은 상의 -> 하의 순서 추천 하나 (하의가 없으면 하의 id 는 None, 횟수는 0)
+    """
+    user_info = (age, sex, style, temperatures, weather, humidity, wind_speed)
+    clothes_attributes = get_clothes_attributes(user_clothes)
+
+    if recommend_select == 0:
+        outfits = run.best_outfits(run.predict_cluster(user_info, CLTH.TOP), clothes_attributes, k)
+        if outfits:
+            return outfits
+
+        top_id, bottom_id = greedy_both_recommend(user_info, clothes_attributes)
+        if top_id == "상의 없음":
+            return []
+        return [(top_id, None if bottom_id == "하의 없음" else bottom_id, 0)]
+
+    # 상의/하의 추천 (top_recommend, bottom_recommend 와 같은 입력)
+    type = "상의" if recommend_select == 1 else "하의"
+    if selected_info == None:
+        df_sorted = run.predict_ranked(type, user_info, CLTH.TOP)
+    else:
+        df_sorted = run.predict_ranked(type, user_info, selected_info, CLTH.TOP)
+    ranked = rank_closet(df_sorted, user_info, clothes_attributes, type, len(clothes_attributes))
+
+    # "다른 옷 보기" 의 1순위가 일반 추천 결과와 같도록 pick_cloth 결과를 맨 앞에 두고 나머지는 중복 없이 점수 순
+    ret, cloth = pick_cloth(df_sorted, user_info, clothes_attributes, type)
+    if ret:
+        pick_id = cloth[-1]
+        scores = dict(ranked)
+        ranked = [(pick_id, scores.get(pick_id, 0.0))] + [(cloth_id, score) for cloth_id, score in ranked
+                                                          if cloth_id != pick_id]
+    return ranked[:k]
+
+
 def main(age, sex, style, temperatures, weather, humidity, wind_speed, recommend_select, selected_info, user_clothes):
     user_info = (age, sex, style, temperatures, weather, humidity, wind_speed)
     # 하의를 먼저할지 상의를 먼저할지는 CLTH.TOP, CLTH.BOTTOM 으로 설정하면 됨
 
     # ==========================================================================================
     # 각 항목의 필요한 필드를 추출하여 2차원 배열로 저장
-    clothes_attributes = [[item['type'], item['color'], item['length'], item['material'], item['printing'], item['id']]
-                          for item in user_clothes]
+    clothes_attributes = get_clothes_attributes(user_clothes)
 
     # ==========================================================================================
     # 전체 추천
@@ -178,6 +194,74 @@ def main(age, sex, style, temperatures, weather, humidity, wind_speed, recommend
         return bottom_recommend(user_info, clothes_attributes, selected_info)
 
 
+def recommend_chunk(user_infos, user_clothes_list, recommend_select, selected_infos):
+    """
+    한 프로세스에서 처리하는 묶음 추천
+    - 단계마다 모든 행의 클러스터를 한 번에 할당(run.predict_ranked_batch)한 뒤 행별로 옷장과 매칭
+    - 반환 값은 행마다 main() 과 같은 형식
+    """
+    clothes_attributes_list = [get_clothes_attributes(user_clothes) for user_clothes in user_clothes_list]
+
+    # 전체 추천: 동시 등장 횟수로 (상의, 하의) 쌍을 고르고, 쌍이 없는 행만 상의 -> 하의 순서로 고름
+    if recommend_select == 0:
+        clusters = run.predict_cluster_batch([(user_info, CLTH.TOP) for user_info in user_infos])
+        results = [("상의 없음", "하의 없음")] * len(user_infos)
+        greedy = []
+        for i, (cluster, clothes_attributes) in enumerate(zip(clusters, clothes_attributes_list)):
+            outfits = run.best_outfits(cluster, clothes_attributes)
+            if outfits:
+                results[i] = outfits[0][:2]
+            else:
+                greedy.append(i)
+
+        tops = {i: pick_cloth(run.ranked_cluster_data(clusters[i], "상의"), user_infos[i], clothes_attributes_list[i],
+                              "상의")[1] for i in greedy}
+        rows = [i for i in greedy if tops[i] is not None]
+        bottom_sorted = run.predict_ranked_batch("하의", [(user_infos[i], tops[i][:-1], CLTH.BOTTOM) for i in rows])
+        for i, df_sorted in zip(rows, bottom_sorted):
+            cloth = pick_bottom_for_top(df_sorted, user_infos[i], clothes_attributes_list[i], tops[i][:-1])
+            results[i] = (tops[i][-1], "하의 없음" if cloth is None else cloth["id"])
+        return results
+
+    # 상의/하의 추천 (top_recommend, bottom_recommend 와 같은 입력)
+    type = "상의" if recommend_select == 1 else "하의"
+    args_list = [(user_info, CLTH.TOP) if selected_info == None else (user_info, selected_info, CLTH.TOP)
+                 for user_info, selected_info in zip(user_infos, selected_infos)]
+    sorted_list = run.predict_ranked_batch(type, args_list)
+    return [pick_cloth(df_sorted, user_info, clothes_attributes, type)
+            for df_sorted, user_info, clothes_attributes in zip(sorted_list, user_infos, clothes_attributes_list)]
+
+
+def _recommend_chunk(args):
+    return recommend_chunk(*args)
+
+
+def main_batch(user_infos, user_clothes_list, recommend_select=0, selected_infos=None,
+               max_workers=None, rows_per_worker=2000):
+    """
+    여러 사용자/날씨 조건을 한 번에 추천 (아침 미리 생성, user_info.csv 전체 평가 등)
+    - user_infos: main() 의 user_info 와 같은 순서의 튜플 목록
+    - user_clothes_list: 행마다 옷장 (main() 의 user_clothes 와 같은 형식)
+    - selected_infos: 상의/하의 추천에서 행마다 선택한 옷 속성 (None 이면 모두 선택 없음)
+    - 행 수가 rows_per_worker 를 넘으면 묶음으로 나눠서 프로세스 풀에서 처리 (max_workers=1 이면 현재 프로세스)
+    """
+    user_infos = [tuple(user_info) for user_info in user_infos]
+    if len(user_infos) != len(user_clothes_list):
+        raise ValueError("user_infos 와 user_clothes_list 의 길이가 다릅니다.")
+    if selected_infos is None:
+        selected_infos = [None] * len(user_infos)
+
+    if len(user_infos) <= rows_per_worker or max_workers == 1:
+        return recommend_chunk(user_infos, user_clothes_list, recommend_select, selected_infos)
+
+    chunks = [(user_infos[start:start + rows_per_worker], user_clothes_list[start:start + rows_per_worker],
+               recommend_select, selected_infos[start:start + rows_per_worker])
+              for start in range(0, len(user_infos), rows_per_worker)]
+    # 각 프로세스는 처음 호출될 때 모델을 한 번만 로드 (run.get_recommender)
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return [result for results in pool.map(_recommend_chunk, chunks) for result in results]
+
+
 if __name__ == "__main__":
     age = "30대"  # 사용자 입력 데이터
     sex = "남성"  # 사용자 입력 데이터
@@ -0,0 +1,103 @@
+import hashlib
+
+import clothes_kmodes.main as clothes_main
+from user_cache import LRUCache
+
+# 날씨 구간 폭 (기온 ℃, 습도 %, 풍속 m/s) - 같은 구간이면 같은 추천 결과를 공유
+TEMPERATURE_BIN = 1.0
+HUMIDITY_BIN = 5.0
+WIND_SPEED_BIN = 0.5
+
+
+def to_bin(value, width):
+    # 구간 대표값 (구간 폭의 배수로 반올림)
+    return round(round(float(value) / width) * width, 3)
+
+
+class ClosetSlot:
+    """
+    내용 순으로 정렬한 옷장에서의 위치 (캐시된 결과에 옷 id 대신 들어가는 값)
+    - 같은 내용의 옷장이면 id 가 달라도 결과를 공유하고, 응답할 때 요청한 옷장의 id 로 되돌림
+    """
+
+    __slots__ = ('position',)
+
+    def __init__(self, position):
+        self.position = position
+
+    def __repr__(self):
+        return f"ClosetSlot({self.position})"
+
+
+def closet_content(item):
+    # 추천에 쓰이는 필드 (id 는 제외)
+    return (str(item['type']), str(item['color']), str(item['length']), str(item['material']), str(item['printing']))
+
+
+def canonical_closet(user_clothes):
+    """
+    옷장을 내용 순으로 정렬 (순서, id 가 달라도 내용이 같으면 같은 결과가 되도록)
+    - 반환 값: (옷장 해시, id 를 ClosetSlot 으로 바꾼 정렬된 옷장, 정렬된 순서의 원래 id 목록)
+    """
+    items = sorted(user_clothes, key=closet_content)
+    contents = [closet_content(item) for item in items]
+    fingerprint = hashlib.sha1(repr(contents).encode('utf-8')).hexdigest()
+    slotted = [{**item, 'id': ClosetSlot(position)} for position, item in enumerate(items)]
+    return fingerprint, slotted, [item['id'] for item in items]
+
+
+def restore_ids(result, ids):
+    # 결과 안의 ClosetSlot 을 요청한 옷장의 id 로 바꿈
+    if isinstance(result, ClosetSlot):
+        return ids[result.position]
+    if isinstance(result, (tuple, list)):
+        return type(result)(restore_ids(value, ids) for value in result)
+    if isinstance(result, dict):
+        return {key: restore_ids(value, ids) for key, value in result.items()}
+    return result
+
+
+class RecommendCache(LRUCache):
+    """
+    clothes_kmodes.main.main 앞에 두는 추천 결과 캐시 (user_cache.LRUCache)
+    - 키: (나이, 성별, 스타일, 구간화한 기온/습도/풍속, 기상, recommend_select, 선택한 옷, 옷장 내용 해시)
+    - 옷장 id 는 키에 넣지 않고 정렬된 옷장의 위치로 결과를 저장 (옷장이 바뀌면 키가 바뀌므로 따로 무효화하지 않음)
+    - 캐시 여부와 상관없이 결과가 같도록 추천은 구간 대표값과 정렬된 옷장으로 계산
+    """
+
+    def __init__(self, maxsize=4096, ttl=3600):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+
+    @staticmethod
+    def make_key(age, sex, style, temperatures, weather, humidity, wind_speed, recommend_select, selected_info,
+                 fingerprint):
+        return (age, sex, style, to_bin(temperatures, TEMPERATURE_BIN), weather, to_bin(humidity, HUMIDITY_BIN),
+                to_bin(wind_speed, WIND_SPEED_BIN), recommend_select,
+                tuple(selected_info) if selected_info is not None else None, fingerprint)
+
+    def _get_or_compute(self, key, ids, compute):
+        # 구간 대표값 (기온, 습도, 풍속)으로 계산
+        _, _, _, temperatures, _, humidity, wind_speed = key[:7]
+        result = self.get_or_load(key, lambda: compute(temperatures, humidity, wind_speed))
+        return restore_ids(result, ids)
+
+    def recommend(self, age, sex, style, temperatures, weather, humidity, wind_speed, recommend_select, selected_info,
+                  user_clothes):
+        # clothes_kmodes.main.main 과 같은 인자
+        fingerprint, closet, ids = canonical_closet(user_clothes)
+        key = self.make_key(age, sex, style, temperatures, weather, humidity, wind_speed, recommend_select,
+                            selected_info, fingerprint)
+        return self._get_or_compute(key, ids, lambda temperatures, humidity, wind_speed: clothes_main.main(
+            age, sex, style, temperatures, weather, humidity, wind_speed, recommend_select, selected_info, closet))
+
+    def top_k(self, age, sex, style, temperatures, weather, humidity, wind_speed, recommend_select, selected_info,
+              user_clothes, k=5):
+        # clothes_kmodes.main.main_top_k 결과 캐시 ("다른 옷 보기" 요청은 다시 계산하지 않음)
+        fingerprint, closet, ids = canonical_closet(user_clothes)
+        key = self.make_key(age, sex, style, temperatures, weather, humidity, wind_speed, recommend_select,
+                            selected_info, fingerprint) + ('top_k', k)
+        return self._get_or_compute(key, ids, lambda temperatures, humidity, wind_speed: clothes_main.main_top_k(
+            age, sex, style, temperatures, weather, humidity, wind_speed, recommend_select, selected_info, closet, k))
+
+
+recommend_cache = RecommendCache()
@@ -1,8 +1,14 @@
+import os
+import threading
+
 import pandas as pd
-from kmodes.kprototypes import KPrototypes
 import joblib
 
 from clothes_kmodes.utils import load_df
+from clothes_kmodes.utils.kproto_kernel import KPrototypesKernel
+from clothes_kmodes.utils.cluster_ranking import build_rankings, load_rankings
+from clothes_kmodes.utils.cluster_table import load_table
+from clothes_kmodes.utils.cooccurrence import CooccurrenceTable
 
 import clothes_kmodes.clothes_enum as CLTH
 import clothes_kmodes.config.config as cfg
@@ -14,6 +20,116 @@ categorical_cols = ['나이', '성별', '스타일', '일 평균 기상',
 
 numerical_cols = ['일 평균 기온', '일 평균 습도', '일 평균 풍속']
 
+
+class Recommender:
+    """
+    k-prototypes 모델과 클러스터 테이블을 한 번만 로드해서 재사용
+    - 범주형 컬럼 인덱스는 로드 시 미리 계산
+    - 클러스터 테이블은 'Cluster' 값별로 미리 나눠 두어 예측 후에는 조회만 수행
+    - 클러스터별 상의/하의 빈도수 정렬 순서는 학습 시 저장한 파일에서 읽음 (없으면 로드 시 한 번 계산)
+    - 클러스터 테이블은 학습 시 저장한 바이너리(.npz)를 우선 사용하고, 없으면 CSV 를 읽음
+    - 상의 x 하의 동시 등장 횟수도 학습 시 저장한 파일에서 읽음 (없으면 로드 시 한 번 계산)
+    """
+
+    def __init__(self, model_path=cfg.kproto_model_path, table_path=cfg.final_result_with_cluster_path,
+                 ranking_path=cfg.cluster_ranking_path, binary_table_path=cfg.cluster_table_path,
+                 cooccurrence_path=cfg.cluster_cooccurrence_path):
+        # 모델 로드
+        self.kproto = joblib.load(model_path)
+        print("모델이 성공적으로 로드되었습니다.")
+
+        if os.path.exists(binary_table_path):
+            self.df = load_table(binary_table_path)
+        else:
+            self.df = pd.read_csv(table_path)
+        self.categorical_cols_indices = [self.df.columns.get_loc(col) for col in categorical_cols]
+        self.clusters = {cluster: frame for cluster, frame in self.df.groupby('Cluster')}
+        self.empty = self.df.iloc[0:0]
+        self.kernel = KPrototypesKernel(self.kproto, self.categorical_cols_indices)
+
+        if os.path.exists(ranking_path):
+            self.rankings = load_rankings(ranking_path)
+        else:
+            self.rankings = build_rankings(self.df)
+
+        if os.path.exists(cooccurrence_path):
+            self.cooccurrence = CooccurrenceTable.load(cooccurrence_path)
+        else:
+            self.cooccurrence = CooccurrenceTable.build(self.df)
+
+    def predict_cluster(self, new_row):
+        # 새로운 데이터 포인트에 대한 클러스터 예측 (kproto.predict 와 같은 결과)
+        return self.kernel.predict([new_row])[0]
+
+    def predict_clusters(self, new_rows):
+        # 여러 데이터 포인트를 한 번에 클러스터 할당
+        return self.kernel.predict(new_rows)
+
+    def cluster_data(self, cluster):
+        # 클러스터에 해당하는 기존 데이터 (호출 측에서 수정해도 되도록 복사본 반환)
+        return self.clusters.get(cluster, self.empty).copy()
+
+    def ranked_cluster_data(self, cluster, type):
+        # '{type} 카테고리', '{type} 색상' 빈도수 순으로 정렬된 클러스터 데이터
+        order = self.rankings.get((int(cluster), type))
+        if order is None:
+            return self.empty.copy()
+        return self.df.iloc[order]
+
+    def best_outfits(self, cluster, clothes_attributes, k=1):
+        # 클러스터의 상의 x 하의 동시 등장 횟수로 옷장의 (상의, 하의) 쌍을 한 번에 점수화
+        return self.cooccurrence.best_outfits(cluster, clothes_attributes, k)
+
+    def predict_ranked(self, type, *args):
+        new_row = new_row_from_args(*args)
+        return self.ranked_cluster_data(self.predict_cluster(new_row), type)
+
+    def predict_ranked_batch(self, type, args_list):
+        # 여러 입력의 클러스터를 한 번에 할당한 뒤 각각 정렬된 클러스터 데이터를 반환
+        if not args_list:
+            return []
+        clusters = self.predict_clusters([new_row_from_args(*args) for args in args_list])
+        return [self.ranked_cluster_data(cluster, type) for cluster in clusters]
+
+    def predict(self, *args):
+        new_row = new_row_from_args(*args)
+        print(new_row)
+
+        cluster_for_new_data = self.predict_cluster(new_row)
+        print(cluster_for_new_data)
+
+        return self.cluster_data(cluster_for_new_data)
+
+
+_recommender = None
+_recommender_lock = threading.Lock()
+
+
+def get_recommender():
+    # 처음 호출될 때 한 번만 로드
+    global _recommender
+    if _recommender is None:
+        with _recommender_lock:
+            if _recommender is None:
+                _recommender = Recommender()
+    return _recommender
+
+
+def new_row_from_args(*args):
+    if len(args) == 2 and isinstance(args[0], tuple) and isinstance(args[1], int):
+        user_info, want_clothes_type = args
+        new_row = load_df.get_row(user_info)
+
+    elif len(args) == 3 and isinstance(args[0], tuple) and isinstance(args[1], tuple) and isinstance(args[2], int):
+        user_info, other_info, want_clothes_type = args
+        if want_clothes_type == CLTH.BOTTOM:
+            new_row = load_df.get_row(user_info, top_info=other_info)
+        else:
+            new_row = load_df.get_row(user_info, bottom_info=other_info)
+
+    return new_row
+
+
 """
 사용자 정보(나이, 성별, 스타일, 일 평균 기온, 일 평균 기상, 일 평균 습도, 일 평균 풍속)에 해당하는
 정보를 입력하여 원하는 상의 OR 하의를 추천함
@@ -23,36 +139,33 @@ user_info에 값을 넣을때는 "나이, 성별, 스타일, 일 평균 기온,
 """
 def predict(*args):
     print("a", args)
-    if len(args) == 2 and isinstance(args[0], tuple) and isinstance(args[1], int):
-        user_info, want_clothes_type = args
-        new_data = load_df.get_from_user_info(user_info)
+    return get_recommender().predict(*args)
 
-    elif len(args) == 3 and isinstance(args[0], tuple) and isinstance(args[1], tuple) and isinstance(args[2], int):
-        user_info, other_info, want_clothes_type = args
-        if want_clothes_type == CLTH.BOTTOM:
-            new_data = load_df.get_from_user_info_and_top(user_info, other_info)
-        else:
-            new_data = load_df.get_from_user_info_and_bottom(user_info, other_info)
 
-    print(new_data)
+def predict_ranked(type, *args):
+    # predict 와 같은 입력으로, type("상의"/"하의") 빈도수 순으로 정렬된 클러스터 데이터를 반환
+    return get_recommender().predict_ranked(type, *args)
+
+
+def predict_ranked_batch(type, args_list):
+    # args_list 의 각 항목은 predict 에 넘기는 인자 튜플
+    return get_recommender().predict_ranked_batch(type, args_list)
+
+
+def predict_cluster(*args):
+    # predict 와 같은 입력으로 클러스터 번호만 반환
+    return get_recommender().predict_cluster(new_row_from_args(*args))
+
 
-    # 모델을 저장할 파일 경로
-    model_path = cfg.kproto_model_path
+def predict_cluster_batch(args_list):
+    if not args_list:
+        return []
+    return list(get_recommender().predict_clusters([new_row_from_args(*args) for args in args_list]))
 
-    # 모델 로드
-    kproto = joblib.load(model_path)
-    print("모델이 성공적으로 로드되었습니다.")
 
-    # 새로운 데이터 포인트에 대한 클러스터 예측
-    df = pd.read_csv(cfg.final_result_with_cluster_path)
-    categorical_cols_indices = [df.columns.get_loc(col) for col in categorical_cols]
-    cluster_for_new_data = kproto.predict(new_data, categorical=categorical_cols_indices)
-    print(cluster_for_new_data)
+def ranked_cluster_data(cluster, type):
+    return get_recommender().ranked_cluster_data(cluster, type)
 
-    # 새로운 데이터 포인트의 클러스터에 해당하는 기존 클러스터 출력
-    cluster_data = df[df['Cluster'] == cluster_for_new_data[0]]
-    # print(f"새로운 데이터 포인트의 클러스터 ({cluster_for_new_data[0]})에 해당하는 데이터:")
-    # print(cluster_data)
-    
-    return cluster_data
 
+def best_outfits(cluster, clothes_attributes, k=1):
+    return get_recommender().best_outfits(cluster, clothes_attributes, k)
@@ -1,6 +1,8 @@
+import argparse
+import json
+
 import pandas as pd
 import numpy as np
-import random
 
 # Define the possible values for each column based on the provided details
 ages = ['20대', '30대', '40대', '50대']
@@ -40,46 +42,138 @@ dress_categories = [
 ]
 
 
-# Generating a fake dataset
-num_entries = 100  # Number of entries you want in the dataset
-data = []
-
-for _ in range(num_entries):
-    age = random.choice(ages)
-    gender = random.choice(genders)
-    style = random.choice(styles)
-    avg_temp = random.choice(average_temperatures)
-    weather = random.choice(weather_conditions)
-    humidity = random.choice(average_humidities)
-    wind_speed = random.choice(average_wind_speeds)
-    top_color, bottom_color = random.sample(colors, 2)
-    top_print, bottom_print = random.sample(prints, 2)
-    material = random.choice(materials)
-    length = random.choice(lengths)
-    top_category = random.choice(top_categories)
-    bottom_category = random.choice(bottom_categories)
-
-    # Append to the data list
-    data.append([
-        age, gender, style, avg_temp, weather, humidity, wind_speed,
-        top_color, top_print, material, length, top_category,
-        bottom_color, bottom_print, material, length, bottom_category
-    ])
-
 # Columns
 columns = [
     '나이', '성별', '스타일', '일 평균 기온', '일 평균 기상', '일 평균 습도', '일 평균 풍속',
     '상의 색상', '상의 프린트', '상의 소재', '상의 기장', '상의 카테고리',
     '하의 색상', '하의 프린트', '하의 소재', '하의 기장', '하의 카테고리']
 
-df = pd.DataFrame(data, columns=columns)
+# Columns that can be resampled from the musinsa weather datasets
+marginal_columns = ['나이', '성별', '일 평균 기온', '일 평균 기상', '일 평균 습도', '일 평균 풍속']
+
+
+def load_marginals(paths):
+    """
+    Pool of (age, gender, temperature, weather, humidity, wind speed) rows from the musinsa weather csv files.
+    Rows are resampled as a whole so every column keeps its empirical marginal (and the weather columns stay
+    consistent with each other).
+    """
+    frames = [pd.read_csv(path, encoding='utf-8-sig', usecols=marginal_columns) for path in paths]
+    return pd.concat(frames, ignore_index=True).dropna()
+
+
+def distinct_pair(rng, values, n):
+    # Two different values per row (vectorized random.sample(values, 2))
+    first = rng.integers(0, len(values), n)
+    second = (first + rng.integers(1, len(values), n)) % len(values)
+    values = np.asarray(values, dtype=object)
+    return values[first], values[second]
+
+
+def generate_chunk(rng, n, marginals=None):
+    """Generate n fake rows with NumPy (same value lists and column layout as the original loop)."""
+    choice = lambda values: rng.choice(np.asarray(values, dtype=object), n)
+
+    if marginals is not None:
+        sampled = marginals.iloc[rng.integers(0, len(marginals), n)]
+        age, gender = sampled['나이'].to_numpy(), sampled['성별'].to_numpy()
+        avg_temp, weather = sampled['일 평균 기온'].to_numpy(), sampled['일 평균 기상'].to_numpy()
+        humidity, wind_speed = sampled['일 평균 습도'].to_numpy(), sampled['일 평균 풍속'].to_numpy()
+    else:
+        age, gender = choice(ages), choice(genders)
+        avg_temp, weather = rng.choice(average_temperatures, n), choice(weather_conditions)
+        humidity, wind_speed = rng.choice(average_humidities, n), rng.choice(average_wind_speeds, n)
+
+    top_color, bottom_color = distinct_pair(rng, colors, n)
+    top_print, bottom_print = distinct_pair(rng, prints, n)
+    material = choice(materials)
+    length = choice(lengths)
+
+    return pd.DataFrame({
+        '나이': age, '성별': gender, '스타일': choice(styles),
+        '일 평균 기온': avg_temp, '일 평균 기상': weather, '일 평균 습도': humidity, '일 평균 풍속': wind_speed,
+        '상의 색상': top_color, '상의 프린트': top_print, '상의 소재': material, '상의 기장': length,
+        '상의 카테고리': choice(top_categories),
+        '하의 색상': bottom_color, '하의 프린트': bottom_print, '하의 소재': material, '하의 기장': length,
+        '하의 카테고리': choice(bottom_categories),
+    }, columns=columns)
+
+
+def generate_closet_chunk(rng, first_user, n_users, closet_size):
+    """Fake closets in the Firestore closet document format (what clothes_kmodes.main.main receives)."""
+    n = n_users * closet_size
+    is_top = rng.random(n) < 0.5
+    category = np.where(is_top, rng.choice(np.asarray(top_categories, dtype=object), n),
+                        rng.choice(np.asarray(bottom_categories, dtype=object), n))
+    color = rng.choice(np.asarray(colors, dtype=object), n)
+    length = rng.choice(np.asarray(lengths, dtype=object), n)
+    material = rng.choice(np.asarray(materials, dtype=object), n)
+    printing = rng.choice(np.asarray(prints, dtype=object), n)
+    style = rng.choice(np.asarray(styles, dtype=object), n)
+
+    for user in range(n_users):
+        uid = f'fake-user-{first_user + user}'
+        items = range(user * closet_size, (user + 1) * closet_size)
+        yield {'uid': uid, 'closet': [
+            {'id': f'{uid}-{i % closet_size}', 'type': category[i], 'color': color[i], 'length': length[i],
+             'material': material[i], 'printing': printing[i], 'style': style[i]} for i in items]}
+
+
+def write_rows(path, rows, chunk_size, rng, marginals=None, fmt='csv', encoding='utf-8'):
+    """Stream rows to csv or parquet, chunk_size rows at a time, so memory does not grow with rows."""
+    writer = None
+    written = 0
+    try:
+        while written < rows:
+            df = generate_chunk(rng, min(chunk_size, rows - written), marginals)
+            if fmt == 'parquet':
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+            else:
+                df.to_csv(path, mode='w' if written == 0 else 'a', header=written == 0, index=False, encoding=encoding)
+            written += len(df)
+            print(f'{written}/{rows} rows')
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def write_closets(path, n_users, closet_size, chunk_size, rng):
+    """One closet per line (JSON lines), generated chunk_size users at a time."""
+    with open(path, 'w', encoding='utf-8') as file:
+        for first_user in range(0, n_users, chunk_size):
+            for closet in generate_closet_chunk(rng, first_user, min(chunk_size, n_users - first_user), closet_size):
+                file.write(json.dumps(closet, ensure_ascii=False) + '\n')
 
 
-# Display the first few rows of the dataframe to check
-print(df.head())
+def parse_opt():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100, help='Number of entries you want in the dataset')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    parser.add_argument('--chunk-size', type=int, default=100000, help='Rows generated and written at a time')
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv',
+                        help='Output format (parquet needs pyarrow)')
+    parser.add_argument('--output', default='./fake_fashion_dataset.csv', help='Output path')
+    parser.add_argument('--encoding', default='utf-8', help='CSV encoding (cp949 for an ansi copy)')
+    parser.add_argument('--marginals', nargs='*', default=None,
+                        help='musinsa_men_weather.csv / musinsa_women_weather.csv to match their marginals')
+    parser.add_argument('--closets', type=int, default=0, help='Number of synthetic user closets to emit')
+    parser.add_argument('--closet-size', type=int, default=20, help='Clothes per synthetic closet')
+    parser.add_argument('--closets-output', default='./fake_user_closets.jsonl', help='Synthetic closets path')
+    return parser.parse_args()
 
-# Save the dataframe to a CSV file
-df.to_csv('./fake_fashion_dataset.csv', index=False)
 
+if __name__ == '__main__':
+    opt = parse_opt()
+    rng = np.random.default_rng(opt.seed)
+    marginals = load_marginals(opt.marginals) if opt.marginals else None
 
+    # Save the dataframe to a CSV (or parquet) file
+    write_rows(opt.output, opt.rows, opt.chunk_size, rng, marginals, opt.format, opt.encoding)
 
+    if opt.closets:
+        write_closets(opt.closets_output, opt.closets, opt.closet_size, opt.chunk_size, rng)
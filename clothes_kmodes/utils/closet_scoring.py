@@ -0,0 +1,51 @@
+import numpy as np
+
+# 옷장 필드 -> 클러스터 테이블 컬럼 접미어 (main 의 clothes_attributes 순서: type, color, length, material, printing)
+attributes = [('type', '카테고리'), ('color', '색상'), ('length', '기장'), ('material', '소재'), ('printing', '프린트')]
+
+# 속성별 가중치 (기존 매칭 기준인 카테고리/색상을 더 크게)
+default_weights = np.array([0.4, 0.3, 0.1, 0.1, 0.1])
+
+
+class ClusterProfile:
+    """
+    매칭된 클러스터 데이터의 속성별 빈도 분포
+    - 카테고리, 색상, 기장, 소재, 프린트마다 {값: 비율} 을 정수 코드 + 확률 벡터로 보관
+    - 옷장 전체를 코드 행렬로 바꾼 뒤 한 번의 행렬 연산으로 점수를 계산
+    """
+
+    def __init__(self, df, type):
+        self.vocab = []
+        self.probs = []
+        for _, suffix in attributes:
+            counts = df[f'{type} {suffix}'].value_counts(normalize=True, sort=False)
+            counts = counts[counts > 0]
+            self.vocab.append({value: code for code, value in enumerate(counts.index)})
+            # 마지막 칸은 분포에 없는 값 (확률 0)
+            self.probs.append(np.append(counts.to_numpy(dtype=np.float64), 0.0))
+
+    def encode(self, clothes_attributes):
+        # 옷장 속성 -> (옷 개수, 속성 개수) 코드 행렬 (분포에 없는 값은 각 속성의 마지막 칸)
+        codes = np.empty((len(clothes_attributes), len(attributes)), dtype=np.int32)
+        for j, vocab in enumerate(self.vocab):
+            unknown = len(vocab)
+            codes[:, j] = [vocab.get(cloth[j], unknown) for cloth in clothes_attributes]
+        return codes
+
+    def score(self, codes, weights=default_weights):
+        # 속성별 확률을 모아 (옷 개수, 속성 개수) 행렬을 만든 뒤 가중합
+        probs = np.stack([self.probs[j][codes[:, j]] for j in range(len(attributes))], axis=1)
+        return probs @ weights, probs[:, 0] > 0
+
+    def top_k(self, clothes_attributes, k=5, weights=default_weights):
+        """
+        옷장에서 점수가 높은 k 개 (id, 점수) 목록
+        - 카테고리가 분포에 없는 옷은 후보에서 제외 (기존 매칭과 같은 조건)
+        - 점수가 같으면 옷장 순서 유지
+        """
+        if not clothes_attributes:
+            return []
+        scores, valid = self.score(self.encode(clothes_attributes), weights)
+        candidates = np.flatnonzero(valid)
+        order = candidates[np.argsort(-scores[candidates], kind='stable')][:k]
+        return [(clothes_attributes[i][-1], float(scores[i])) for i in order]
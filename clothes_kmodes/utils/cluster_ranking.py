@@ -0,0 +1,44 @@
+import numpy as np
+
+# 정렬 기준 옷 종류 (컬럼 접두어)
+types = ("상의", "하의")
+
+
+def rank_rows(df, type):
+    """
+    '{type} 카테고리', '{type} 색상' 의 빈도수 내림차순으로 정렬한 행 위치 (main.data_sort 와 같은 순서)
+    - 빈도수가 같으면 원래 행 순서 유지 (안정 정렬)
+    """
+    category = df[f'{type} 카테고리']
+    color = df[f'{type} 색상']
+    category_count = category.map(category.value_counts()).fillna(-1).to_numpy()
+    color_count = color.map(color.value_counts()).fillna(-1).to_numpy()
+    return np.lexsort((-color_count, -category_count)).astype(np.int32)
+
+
+def build_rankings(df, cluster_col='Cluster'):
+    """
+    클러스터별, 옷 종류별로 미리 정렬한 행 순서
+    - 반환 값: {(cluster, "상의"/"하의"): df 전체 기준 행 위치 배열(int32)}
+    """
+    rankings = {}
+    positions = np.arange(len(df), dtype=np.int32)
+    for cluster, index in df.groupby(cluster_col).indices.items():
+        cluster_df = df.iloc[index]
+        for type in types:
+            rankings[(int(cluster), type)] = positions[index][rank_rows(cluster_df, type)]
+    return rankings
+
+
+def save_rankings(path, rankings):
+    # "클러스터_종류" 키로 압축 저장 (예: "3_상의")
+    np.savez_compressed(path, **{f"{cluster}_{type}": order for (cluster, type), order in rankings.items()})
+
+
+def load_rankings(path):
+    rankings = {}
+    with np.load(path) as data:
+        for key in data.files:
+            cluster, type = key.split("_")
+            rankings[(int(cluster), type)] = data[key]
+    return rankings
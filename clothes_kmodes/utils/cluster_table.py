@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+
+def save_table(path, df, categorical_cols):
+    """
+    클러스터 테이블을 컬럼 단위 바이너리(.npz, 압축 없음)로 저장
+    - 범주형 컬럼: 모든 범주형 컬럼이 공유하는 어휘(vocab) + 컬럼별 정수 코드 (결측은 -1)
+    - 그 외 컬럼: 수치형은 float32, 'Cluster' 는 int16
+    - 컬럼 순서(columns)를 함께 저장해서 로드 시 CSV 와 같은 순서로 복원
+    """
+    values = pd.unique(df[categorical_cols].to_numpy(dtype=object).ravel())
+    vocab = np.array(sorted(value for value in values if not pd.isna(value)), dtype=str)
+    code_dtype = np.int16 if len(vocab) < np.iinfo(np.int16).max else np.int32
+
+    arrays = {'columns': np.array(df.columns, dtype=str), 'categorical': np.array(categorical_cols, dtype=str),
+              'vocab': vocab}
+    for i, col in enumerate(df.columns):
+        if col in categorical_cols:
+            arrays[f'col{i}'] = pd.Categorical(df[col], categories=vocab).codes.astype(code_dtype)
+        elif col == 'Cluster':
+            arrays[f'col{i}'] = df[col].to_numpy(dtype=np.int16)
+        else:
+            arrays[f'col{i}'] = df[col].to_numpy(dtype=np.float32)
+    np.savez(path, **arrays)
+
+
+def load_table(path):
+    # 범주형 컬럼은 같은 CategoricalDtype(공유 어휘)을 쓰는 pandas Categorical 로 복원
+    with np.load(path) as data:
+        columns = list(data['columns'])
+        categorical = set(data['categorical'])
+        dtype = pd.CategoricalDtype(data['vocab'])
+        table = {}
+        for i, col in enumerate(columns):
+            values = data[f'col{i}']
+            table[col] = pd.Categorical.from_codes(values, dtype=dtype) if col in categorical else values
+    return pd.DataFrame(table, columns=columns)
@@ -0,0 +1,86 @@
+import numpy as np
+from scipy import sparse
+
+
+class CooccurrenceTable:
+    """
+    클러스터별 상의 (카테고리, 색상) x 하의 (카테고리, 색상) 동시 등장 횟수
+    - 상의/하의 키는 모든 클러스터가 공유하는 어휘로 정수 코드화
+    - 클러스터마다 (상의 키 수, 하의 키 수) 희소 행렬(CSR) 하나
+    """
+
+    def __init__(self, top_keys, bottom_keys, matrices):
+        self.top_keys = [tuple(key) for key in top_keys]
+        self.bottom_keys = [tuple(key) for key in bottom_keys]
+        self.top_vocab = {key: code for code, key in enumerate(self.top_keys)}
+        self.bottom_vocab = {key: code for code, key in enumerate(self.bottom_keys)}
+        self.matrices = matrices
+
+    @classmethod
+    def build(cls, df, cluster_col='Cluster'):
+        top = list(zip(df['상의 카테고리'], df['상의 색상']))
+        bottom = list(zip(df['하의 카테고리'], df['하의 색상']))
+        top_keys = list(dict.fromkeys(top))
+        bottom_keys = list(dict.fromkeys(bottom))
+        top_vocab = {key: code for code, key in enumerate(top_keys)}
+        bottom_vocab = {key: code for code, key in enumerate(bottom_keys)}
+
+        rows = np.array([top_vocab[key] for key in top], dtype=np.int32)
+        cols = np.array([bottom_vocab[key] for key in bottom], dtype=np.int32)
+        clusters = df[cluster_col].to_numpy()
+        shape = (len(top_keys), len(bottom_keys))
+        matrices = {}
+        for cluster in np.unique(clusters):
+            index = clusters == cluster
+            # 같은 (행, 열) 은 더해져서 횟수가 됨
+            matrices[int(cluster)] = sparse.csr_matrix(
+                (np.ones(index.sum(), dtype=np.int32), (rows[index], cols[index])), shape=shape)
+        return cls(top_keys, bottom_keys, matrices)
+
+    def save(self, path):
+        # 클러스터별 COO (행, 열, 횟수)를 이어 붙여 저장
+        clusters, rows, cols, counts = [], [], [], []
+        for cluster, matrix in self.matrices.items():
+            coo = matrix.tocoo()
+            clusters.append(np.full(coo.nnz, cluster, dtype=np.int16))
+            rows.append(coo.row)
+            cols.append(coo.col)
+            counts.append(coo.data)
+        np.savez_compressed(path, top_keys=np.array(self.top_keys, dtype=str).reshape(-1, 2),
+                            bottom_keys=np.array(self.bottom_keys, dtype=str).reshape(-1, 2),
+                            cluster=np.concatenate(clusters), row=np.concatenate(rows).astype(np.int32),
+                            col=np.concatenate(cols).astype(np.int32), count=np.concatenate(counts).astype(np.int32))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            shape = (len(data['top_keys']), len(data['bottom_keys']))
+            matrices = {}
+            for cluster in np.unique(data['cluster']):
+                index = data['cluster'] == cluster
+                matrices[int(cluster)] = sparse.csr_matrix(
+                    (data['count'][index], (data['row'][index], data['col'][index])), shape=shape)
+            return cls(data['top_keys'], data['bottom_keys'], matrices)
+
+    def best_outfits(self, cluster, clothes_attributes, k=1):
+        """
+        옷장의 모든 (상의, 하의) 쌍을 한 번에 점수화해서 동시 등장 횟수가 많은 k 개 반환
+        - clothes_attributes: main 의 [type, color, length, material, printing, id] 목록
+        - 반환 값: [(상의 id, 하의 id, 횟수), ...] (횟수가 0 인 쌍은 제외, 같으면 옷장 순서)
+        """
+        matrix = self.matrices.get(int(cluster))
+        if matrix is None:
+            return []
+        tops = [(self.top_vocab[(cloth[0], cloth[1])], cloth[-1]) for cloth in clothes_attributes
+                if (cloth[0], cloth[1]) in self.top_vocab]
+        bottoms = [(self.bottom_vocab[(cloth[0], cloth[1])], cloth[-1]) for cloth in clothes_attributes
+                   if (cloth[0], cloth[1]) in self.bottom_vocab]
+        if not tops or not bottoms:
+            return []
+
+        top_codes, top_ids = zip(*tops)
+        bottom_codes, bottom_ids = zip(*bottoms)
+        scores = matrix[list(top_codes)][:, list(bottom_codes)].toarray().ravel()
+        order = np.argsort(-scores, kind='stable')[:k]
+        return [(top_ids[i // len(bottoms)], bottom_ids[i % len(bottoms)], int(scores[i]))
+                for i in order if scores[i] > 0]
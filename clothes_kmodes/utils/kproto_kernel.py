@@ -0,0 +1,57 @@
+import numpy as np
+
+
+class KPrototypesKernel:
+    """
+    학습된 KPrototypes 모델의 클러스터 할당을 NumPy 로 계산
+    - cluster_centroids_ 와 gamma 만 사용하고, 범주형 값은 로드 시 한 번만 정수 코드로 변환
+    - 거리 = 수치형 유클리드 제곱 거리 + gamma * 범주형 불일치 개수 (kproto.predict 와 동일)
+    - 여러 행을 한 번에 할당할 수 있음 (chunk_size 행 단위로 나눠서 계산)
+
+    입력 행은 kproto.predict 에 넘기는 것과 같은 컬럼 순서이고, categorical 은 그때의 범주형 컬럼 인덱스
+    """
+
+    def __init__(self, kproto, categorical, chunk_size=65536):
+        centroids = kproto.cluster_centroids_
+        self.categorical = list(categorical)
+        self.chunk_size = chunk_size
+        self.gamma = kproto.gamma
+
+        n_num = centroids.shape[1] - len(self.categorical)
+        self.numerical = None  # 입력 컬럼 수를 처음 볼 때 결정
+        self.num_centroids = centroids[:, :n_num].astype(np.float64)
+
+        # 범주형 중심값 -> 정수 코드 (중심에 없는 값은 -1 로 인코딩되어 항상 불일치)
+        cat_centroids = centroids[:, n_num:]
+        self.vocab = [{value: code for code, value in enumerate(dict.fromkeys(cat_centroids[:, j]))}
+                      for j in range(cat_centroids.shape[1])]
+        self.cat_centroids = np.array([[self.vocab[j][value] for j, value in enumerate(row)] for row in cat_centroids],
+                                      dtype=np.int32).reshape(len(centroids), -1)
+
+    def encode(self, rows):
+        rows = np.asarray(rows, dtype=object)
+        if rows.ndim == 1:
+            rows = rows[None]
+        if self.numerical is None:
+            self.numerical = [i for i in range(rows.shape[1]) if i not in self.categorical]
+        x_num = rows[:, self.numerical].astype(np.float64)
+        x_cat = np.empty((len(rows), len(self.categorical)), dtype=np.int32)
+        for j, col in enumerate(self.categorical):
+            vocab = self.vocab[j]
+            x_cat[:, j] = [vocab.get(value, -1) for value in rows[:, col]]
+        return x_num, x_cat
+
+    def costs(self, x_num, x_cat):
+        num_costs = ((self.num_centroids[None, :, :] - x_num[:, None, :]) ** 2).sum(axis=2)
+        cat_costs = (self.cat_centroids[None, :, :] != x_cat[:, None, :]).sum(axis=2)
+        return num_costs + self.gamma * cat_costs
+
+    def predict_encoded(self, x_num, x_cat):
+        labels = np.empty(len(x_num), dtype=np.uint16)
+        for start in range(0, len(x_num), self.chunk_size):
+            end = start + self.chunk_size
+            labels[start:end] = np.argmin(self.costs(x_num[start:end], x_cat[start:end]), axis=1)
+        return labels
+
+    def predict(self, rows):
+        return self.predict_encoded(*self.encode(rows))
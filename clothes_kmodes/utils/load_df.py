@@ -1,5 +1,18 @@
 import pandas as pd
 
+# 예측 입력 컬럼 순서 (아래 get_from_* 함수들이 만드는 DataFrame 과 동일)
+columns = ['나이', '성별', '스타일', '일 평균 기온', '일 평균 기상', '일 평균 습도', '일 평균 풍속',
+           '상의 색상', '상의 프린트', '상의 소재', '상의 기장', '상의 카테고리',
+           '하의 색상', '하의 프린트', '하의 소재', '하의 기장', '하의 카테고리']
+
+NONE_INFO = ('없음', '없음', '없음', '없음', '없음')
+
+
+def get_row(user_info: tuple, top_info: tuple = NONE_INFO, bottom_info: tuple = NONE_INFO):
+    # DataFrame 을 만들지 않고 같은 컬럼 순서의 한 행(list)만 생성
+    age, gender, style, temperature, weather, humidity, wind = user_info
+    return [age, gender, style, temperature, weather, humidity, wind, *top_info, *bottom_info]
+
 
 def get_from_user_info(user_info: tuple):
     age, gender, style, temperature, weather, humidity, wind = user_info
@@ -1,4 +1,3 @@
-import pandas as pd
 from flask import Flask, request, jsonify
 import firebase_admin
 from firebase_admin import credentials, firestore, storage
@@ -10,21 +9,81 @@ from werkzeug.exceptions import NotFound, MethodNotAllowed
 import top_bottom_chg
 import weather_api
 from clothes_detector import detector
-import os
-from datetime import datetime
 import urllib.parse
-import clothes_kmodes.main as clothes_main
+from clothes_kmodes.recommend_cache import recommend_cache
 from logger import log_request
+from closet_store import ClosetStore
+from user_cache import profile_cache, closet_cache
 
 cred = credentials.Certificate("flask-server/firebase/serviceAccountKey.json")
 firebase_admin.initialize_app(cred)
 db = firestore.client()
+bucket = storage.bucket('todays-clothes-1100f.appspot.com')
 
 app = Flask(__name__)
 
-RESULT_FOLDER = "clothes_detector/result/"
-DATASET_FOLDER = "clothes_detector/dataset/"
-app.config['UPLOAD_FOLDER'] = DATASET_FOLDER
+# 옷 검출 모델 (프로세스 시작 시 한 번만 로드)
+cloth_detector = detector.ClothesDetector()
+
+# 동시 요청 이미지를 모아 한 배치로 추론 (최대 배치 크기, 최대 대기 시간(초))
+INFERENCE_MAX_BATCH_SIZE = 8
+INFERENCE_MAX_WAIT = 0.01
+inference_scheduler = detector.InferenceScheduler(cloth_detector, INFERENCE_MAX_BATCH_SIZE, INFERENCE_MAX_WAIT)
+
+# 검출된 옷 저장 (True 이면 속성 검출 직후 응답하고 업로드/저장은 백그라운드에서 진행)
+PERSIST_IN_BACKGROUND = False
+closet_store = ClosetStore(db, bucket)
+
+# 요청이 많은 격자의 날씨를 발표 직후 미리 갱신
+weather_api.prefetcher.start()
+
+
+def load_user_profile(uid):
+    # 사용자 프로필 (캐시 우선, 없으면 Firestore 조회)
+    profile = profile_cache.get_or_load(uid, lambda: db.collection('users').document(uid).get().to_dict())
+    return dict(profile) if profile is not None else None
+
+
+def load_user_closet(uid):
+    # 사용자 옷장 (캐시 우선, 없으면 Firestore 조회)
+    closet = closet_cache.get_or_load(
+        uid, lambda: [{'id': doc.id, **doc.to_dict()} for doc in db.collection('users').document(uid).collection('closet').get()])
+    return [dict(cloth) for cloth in closet]
+
+
+def load_user_clothes_by_type(uid, types):
+    # 옷장이 캐시에 있으면 메모리에서 거르고, 없으면 Firestore 에서 해당 종류의 추천용 필드만 조회
+    closet = closet_cache.get(uid)
+    if closet is not None:
+        return [dict(cloth) for cloth in closet if cloth['type'] in types]
+    return closet_store.query(uid, types, ClosetStore.RECOMMEND_FIELDS)
+
+
+def find_cloth(uid, cloth_id):
+    # 옷 하나 조회 (캐시된 옷장 우선)
+    closet = closet_cache.get(uid)
+    if closet is not None:
+        for cloth in closet:
+            if cloth['id'] == cloth_id:
+                return dict(cloth)
+    return closet_store.get(uid, cloth_id)
+
+
+def resolve_cloth(uid, cloth_id, clothes_by_id):
+    # 추천된 옷은 이미 조회한 옷에서 찾고, 추천용 필드만 받아온 경우에만 전체 문서를 조회
+    cloth = clothes_by_id.get(cloth_id)
+    if cloth is None or 'imageUrl' not in cloth:
+        cloth = closet_store.get(uid, cloth_id)
+    return cloth
+
+
+def resolve_clothes(uid, cloth_ids, clothes_by_id):
+    # resolve_cloth 의 여러 개 버전: 전체 문서가 필요한 옷만 한 번에 조회 (삭제된 옷은 결과에 없음)
+    resolved = {cloth_id: clothes_by_id[cloth_id] for cloth_id in cloth_ids
+                if cloth_id in clothes_by_id and 'imageUrl' in clothes_by_id[cloth_id]}
+    missing = [cloth_id for cloth_id in cloth_ids if cloth_id not in resolved]
+    resolved.update(closet_store.get_many(uid, missing))
+    return resolved
 
 
 # 루트
@@ -34,11 +93,6 @@ def hello_world():
     return jsonify(), 404
 
 
-# CSV 파일 로드
-CSV_FILE_PATH = r'data/lat_lon_grid_utf8.csv'
-grid_data = pd.read_csv(CSV_FILE_PATH)
-
-
 @app.route('/weather/get', methods=['GET'])
 def weather():
     log_request(request)
@@ -81,11 +135,7 @@ def clothes_propose():
     log_request(request)
     try:
         uid = request.args.get('uid')
-        user_doc_ref = db.collection('users').document(uid)
-        user_doc = user_doc_ref.get()
-        user_data = user_doc.to_dict()
-
-        user_closet_doc = user_doc_ref.collection('closet').get()
+        user_data = load_user_profile(uid)
         user_clothes = []
 
         age = user_data['age']
@@ -99,15 +149,12 @@ def clothes_propose():
 
         if recommend_flag == 0:
             recommend_select = 0
-            for i in user_closet_doc:
-                user_clothes.append({"id": i.id, **i.to_dict()})
+            user_clothes = load_user_closet(uid)
 
         elif recommend_flag == 1:
             cloth_id = request.args.get('clothId')
 
-            doc_ref = db.collection('users').document(uid).collection('closet').document(cloth_id)
-            doc = doc_ref.get()
-            doc_data = doc.to_dict()
+            doc_data = find_cloth(uid, cloth_id)
 
             cloth_color = doc_data['color']
             cloth_print = doc_data['printing']
@@ -117,16 +164,10 @@ def clothes_propose():
 
             if cloth_category in top_bottom_chg.top:
                 recommend_select = 2
-                for i in user_closet_doc:
-                    d = i.to_dict()
-                    if d['type'] in top_bottom_chg.bottom:
-                        user_clothes.append({"id": i.id, **i.to_dict()})
+                user_clothes = load_user_clothes_by_type(uid, top_bottom_chg.bottom)
             elif cloth_category in top_bottom_chg.bottom:
                 recommend_select = 1
-                for i in user_closet_doc:
-                    d = i.to_dict()
-                    if d['type'] in top_bottom_chg.top:
-                        user_clothes.append({"id": i.id, **i.to_dict()})
+                user_clothes = load_user_clothes_by_type(uid, top_bottom_chg.top)
 
         if not age or not sex or not style:
             return jsonify({'error': 'Age, Sex, and Style are required'}), 400
@@ -137,6 +178,13 @@ def clothes_propose():
         if recommend_select not in [0, 1, 2]:
             return jsonify({'error': 'Invalid recommend_select value. Use 0 for both recommendation, 1 for top recommendation, 2 for bottom recommendation'}), 400
 
+        # 후보 수 (topK, 양의 정수)
+        top_k = request.args.get('topK')
+        if top_k is not None:
+            if not re.fullmatch(r'[0-9]+', top_k) or int(top_k) <= 0:
+                return jsonify({'error': 'topK must be a positive integer'}), 400
+            top_k = int(top_k)
+
         if recommend_select in [1, 2] and (not cloth_color or not cloth_print or not cloth_material or not cloth_length or not cloth_category):
             return jsonify({'error': 'Cloth attributes are required for partial recommendation'}), 400
 
@@ -159,24 +207,38 @@ def clothes_propose():
             cloth_color, cloth_print, cloth_material, cloth_length, cloth_category
         ) if recommend_select in [1, 2] else None
 
-        # 옷 추천 모델 호출
-        result = clothes_main.main(age, sex, style, temperatures, weather, humidity, wind_speed, recommend_select, selected_info, user_clothes)
+        # 후보 목록 요청 (topK 개를 점수 순으로, "다른 옷 보기"는 캐시된 목록에서 응답)
+        if top_k is not None:
+            candidates = recommend_cache.top_k(age, sex, style, temperatures, weather, humidity, wind_speed,
+                                               recommend_select, selected_info, user_clothes, k=top_k)
+            user_clothes_by_id = {cloth['id']: cloth for cloth in user_clothes}
+
+            # 후보 옷 문서는 한 번에 조회하고, 그 사이 삭제된 옷이 들어간 후보는 제외
+            if recommend_select == 0:
+                # 전체 추천: (상의, 하의) 조합 후보 (1순위는 일반 추천 결과와 같음)
+                clothes = resolve_clothes(uid, [cloth_id for top_id, bottom_id, _ in candidates
+                                                for cloth_id in (top_id, bottom_id) if cloth_id], user_clothes_by_id)
+                return jsonify([{'top': clothes[top_id], 'bottom': clothes[bottom_id] if bottom_id else None,
+                                 'score': score} for top_id, bottom_id, score in candidates
+                                if top_id in clothes and (not bottom_id or bottom_id in clothes)]), 200
+            clothes = resolve_clothes(uid, [cloth_id for cloth_id, _ in candidates], user_clothes_by_id)
+            return jsonify([{**clothes[cloth_id], 'score': score} for cloth_id, score in candidates
+                            if cloth_id in clothes]), 200
+
+        # 옷 추천 모델 호출 (같은 조건/옷장이면 캐시된 결과 사용)
+        result = recommend_cache.recommend(age, sex, style, temperatures, weather, humidity, wind_speed, recommend_select,
+                                           selected_info, user_clothes)
+        user_clothes_by_id = {cloth['id']: cloth for cloth in user_clothes}
 
         if recommend_select == 0:  # 전체 추천
             top_id, bottom_id = result
 
             data = []
             if top_id != "상의 없음":
-                doc_ref = db.collection('users').document(uid).collection('closet').document(top_id)
-                doc = doc_ref.get()
-                doc_data = {"id": top_id, **doc.to_dict()}
-                data.append(doc_data)
+                data.append(resolve_cloth(uid, top_id, user_clothes_by_id))
 
             if bottom_id != "하의 없음":
-                doc_ref = db.collection('users').document(uid).collection('closet').document(bottom_id)
-                doc = doc_ref.get()
-                doc_data = {"id": bottom_id, **doc.to_dict()}
-                data.append(doc_data)
+                data.append(resolve_cloth(uid, bottom_id, user_clothes_by_id))
 
             response_data = jsonify(data), 200
         elif recommend_select == 1:  # 상의 추천
@@ -184,20 +246,16 @@ def clothes_propose():
             print(f"top- {top_clothes}")
             if success:
                 top_color, top_print, top_material, top_length, top_category, top_id = top_clothes
-                doc_ref = db.collection('users').document(uid).collection('closet').document(top_id)
-                doc = doc_ref.get()
 
-                response_data = jsonify({"id": top_id, **doc.to_dict()}), 200
+                response_data = jsonify(resolve_cloth(uid, top_id, user_clothes_by_id)), 200
             else:
                 response_data = jsonify({}), 200
         elif recommend_select == 2:  # 하의 추천
             success, bottom_clothes = result
             if success:
                 bottom_color, bottom_print, bottom_material, bottom_length, bottom_category, bottom_id = bottom_clothes
-                doc_ref = db.collection('users').document(uid).collection('closet').document(bottom_id)
-                doc = doc_ref.get()
 
-                response_data = jsonify({"id": bottom_id, **doc.to_dict()}), 200
+                response_data = jsonify(resolve_cloth(uid, bottom_id, user_clothes_by_id)), 200
             else:
                 response_data = jsonify({}), 200
 
@@ -240,6 +298,7 @@ def user_info_update():
             'age': age,
             'sex': sex,
         })
+        profile_cache.patch(uid, {'age': age, 'sex': sex})
 
         return jsonify({"message": "update successful"}), 200
     except:
@@ -255,9 +314,7 @@ def user_info_get():
     if uid is None:
         return jsonify({'error': 'uid is None'}), 400
 
-    doc_ref = db.collection('users').document(uid)
-    doc = doc_ref.get()
-    doc_data = doc.to_dict()
+    doc_data = load_user_profile(uid)
 
     if not 'age' in doc_data:
         doc_data['age'] = ""
@@ -277,68 +334,31 @@ def add_clothes():
     uid = request.form.get('uid')
     image_file = request.files.get('image')
     image_name = request.form.get('imageName').replace("\"", "")
-    cloth_name = None
 
     if image_file.filename == '':
         log.error('No image file name')
         return jsonify({'error': 'No image file name'}), 400
 
-    # 파일 저장
-    if image_file:
-        image_file.save(os.path.join(app.config['UPLOAD_FOLDER'], image_file.filename))
-
     uid = re.sub(r"[^\uAC00-\uD7A30-9a-zA-Z\s]", "", uid)
 
-    # result 폴더 정리
-    result_folder_clear(uid)
-
-    # 모듈 실행
-    opt = detector.parse_opt()
-    result = detector.main(opt)
-    keys = result.keys()
-
-    for i in keys:
-        if str(i).replace(uid, '') == '':
-            return jsonify({'error': 'no detections'}), 400
-
-        if str(i).find(uid) != -1:
-            cloth_name = str(i).replace(uid, '')
-            cloth_type = str(i).split('_')[1]
-
-            if cloth_name is None:
-                return jsonify({'error': 'module execution failed'}), 503
-
-            # 이미지를 Google Cloud Storage에 업로드
-            result_image = os.path.join(RESULT_FOLDER, str(i) + '.jpg')
-            bucket = storage.bucket('todays-clothes-1100f.appspot.com')
-            blob = bucket.blob(f'images/{uid}/{cloth_type + "_" + image_name}')
-            with open(result_image, 'rb') as file:
-                blob.upload_from_file(file)
-
-            # 이미지 URL 생성
-            image_url = blob.public_url
-
-            detail = result.get(i)
-            color = detail.get('color')
-            length = detail.get('length')
-            material = detail.get('material')
-            printing = detail.get('print')
-            style = detail.get('style')
-            add_date = str(datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-
-            # Firestore에 이미지 URL과 기타 정보 저장
-            doc_ref = db.collection('users').document(uid).collection('closet').document()
-            doc_ref.set({
-                'type': cloth_type,
-                'imageUrl': image_url,
-                'imageName': image_name,
-                'color': color,
-                'length': length,
-                'material': material,
-                'printing': printing,
-                'style': style,
-                'addDate': add_date
-            })
+    # 모듈 실행 (업로드된 이미지를 디스크에 저장하지 않고 메모리에서 바로 검출)
+    try:
+        garments = inference_scheduler.detect(image_file.read())
+    except ValueError as e:
+        # 디코딩할 수 없는 이미지는 이 요청만 실패 처리
+        log.error(f'Invalid image: {e}')
+        return jsonify({'error': 'invalid image'}), 400
+
+    if not garments:
+        return jsonify({'error': 'no detections'}), 400
+
+    # 이미지 업로드 및 Firestore 저장
+    if PERSIST_IN_BACKGROUND:
+        future = closet_store.save_in_background(uid, image_name, garments)
+        future.add_done_callback(lambda f: closet_cache.invalidate(uid))
+    else:
+        closet_store.save(uid, image_name, garments)
+    closet_cache.invalidate(uid)
 
     response_data = {
         'message': 'Data received successfully',
@@ -349,25 +369,12 @@ def add_clothes():
     return jsonify({'message': 'clothes add successfully'}), 200
 
 
-def result_folder_clear(uid):
-    for file_name in os.listdir(RESULT_FOLDER):
-        if uid == file_name.split('_')[0]:
-            file_path = os.path.join(RESULT_FOLDER, file_name)
-            if os.path.isfile(file_path):
-                os.remove(file_path)
-
-
 # 옷장 가져오기
 @app.route('/clothes/get/<uid>', methods=['GET'])
 def get_closet(uid):
     log_request(request)
     try:
-        doc_ref = db.collection('users').document(uid).collection('closet')
-        docs = doc_ref.get()
-        closet_data = []
-        for doc in docs:
-            data = {'id': doc.id, **doc.to_dict()}
-            closet_data.append(data)
+        closet_data = load_user_closet(uid)
 
         log.info(str(closet_data))
         return jsonify(closet_data), 200
@@ -392,7 +399,6 @@ def delete_closet(uid, cloth_id):
                 decoded_file_path = urllib.parse.unquote(file_path)
 
                 # Storage에서 파일 삭제
-                bucket = storage.bucket('todays-clothes-1100f.appspot.com')
                 blob = bucket.blob(decoded_file_path)
                 if blob.exists():
                     blob.delete()
@@ -401,6 +407,7 @@ def delete_closet(uid, cloth_id):
                     return jsonify({'error': 'image not found in storage'}), 400
 
             doc_ref.delete()
+            closet_cache.invalidate(uid)
 
             log.info('Data and file deleted successfully')
             return jsonify({'message': 'Data and file deleted successfully'}), 200
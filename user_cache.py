@@ -0,0 +1,63 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    크기 제한(LRU)과 만료 시간(TTL)이 있는 스레드 안전 캐시
+    - maxsize 를 넘으면 가장 오래 사용하지 않은 항목부터 제거
+    - ttl 초가 지난 항목은 조회 시 만료 처리
+    """
+
+    _MISSING = object()
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, self._MISSING)
+            if item is self._MISSING:
+                return default
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def patch(self, key, fields):
+        # 캐시된 dict 값의 일부 필드만 갱신 (없으면 아무것도 하지 않음)
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and isinstance(item[0], dict):
+                item[0].update(fields)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def get_or_load(self, key, loader):
+        value = self.get(key, self._MISSING)
+        if value is self._MISSING:
+            value = loader()
+            # 없는 문서(None)는 캐시하지 않음 (곧 생성될 수 있으므로 다음 요청에서 다시 조회)
+            if value is not None:
+                self.set(key, value)
+        return value
+
+
+# 사용자 프로필(uid -> dict)과 옷장(uid -> [{"id": ..., ...}]) 캐시
+profile_cache = LRUCache(maxsize=4096, ttl=600)
+closet_cache = LRUCache(maxsize=1024, ttl=300)
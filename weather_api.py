@@ -1,28 +1,68 @@
+import numpy as np
 import pandas as pd
 import logging as log
+from scipy.spatial import cKDTree
 
+import threading
+import time
+from collections import Counter
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
 
 
 # CSV 파일 로드
 CSV_FILE_PATH = r'data/lat_lon_grid_utf8.csv'
-grid_data = pd.read_csv(CSV_FILE_PATH)
 
 
-def find_closest_region(lat, lon):
-    grid_data['경도(초/100)'] = grid_data['경도(초/100)'].astype(float)
-    grid_data['위도(초/100)'] = grid_data['위도(초/100)'].astype(float)
+class RegionIndex:
+    """
+    위경도 -> 가장 가까운 행정구역(기상청 격자) 검색용 공간 인덱스
+    - 시작 시 한 번만 CSV 를 읽어 연속된 float 배열로 KD-tree 생성
+    - 기존과 같은 맨해튼 거리(p=1)를 사용하고, 거리가 같으면 CSV 의 앞쪽 행을 선택
+    """
+
+    def __init__(self, csv_path, k=8):
+        grid_data = pd.read_csv(csv_path)
+        self.k = min(k, len(grid_data))
+        self.lon = grid_data['경도(초/100)'].to_numpy(dtype=np.float64)
+        self.lat = grid_data['위도(초/100)'].to_numpy(dtype=np.float64)
+        self.nx = grid_data['격자 X'].to_numpy()
+        self.ny = grid_data['격자 Y'].to_numpy()
+        self.region_1 = grid_data['1단계'].to_numpy()
+        self.region_2 = grid_data['2단계'].to_numpy()
+        self.region_3 = grid_data['3단계'].to_numpy()
+        self.tree = cKDTree(np.column_stack((self.lon, self.lat)))
+
+    def query(self, lats, lons):
+        # 여러 좌표를 한 번에 검색해서 행 번호 배열을 반환
+        points = np.column_stack((np.atleast_1d(lons), np.atleast_1d(lats))).astype(np.float64)
+        dist, idx = self.tree.query(points, k=self.k, p=1)
+        dist, idx = dist.reshape(len(points), -1), idx.reshape(len(points), -1)
+        # 최소 거리와 같은 후보 중 가장 앞선 행 (pandas idxmin 과 동일)
+        return np.where(dist == dist[:, :1], idx, len(self.lon)).min(axis=1)
+
+    def region(self, i):
+        return self.nx[i], self.ny[i], self.region_1[i], self.region_2[i], self.region_3[i]
+
+    def find(self, lat, lon):
+        return self.region(self.query(lat, lon)[0])
+
+    def find_many(self, lats, lons):
+        return [self.region(i) for i in self.query(lats, lons)]
+
+
+region_index = RegionIndex(CSV_FILE_PATH)
+
 
-    closest_row = grid_data.iloc[((grid_data['경도(초/100)'] - lon).abs() + (grid_data['위도(초/100)'] - lat).abs()).idxmin()]
+def find_closest_region(lat, lon):
+    return region_index.find(lat, lon)
 
-    region_1 = closest_row['1단계']
-    region_2 = closest_row['2단계']
-    region_3 = closest_row['3단계']
-    nx = closest_row['격자 X']
-    ny = closest_row['격자 Y']
 
-    return nx, ny, region_1, region_2, region_3
+def find_closest_regions(lats, lons):
+    return region_index.find_many(lats, lons)
 
 
 # 가장 가까운 예보 시간을 계산 (초단기예보 및 실황용)
@@ -69,14 +109,35 @@ def get_short_base_time():
     return base_date, base_time
 
 
-# 현재 날씨 정보 가져오기 (초단기실황)
-def get_current_weather_info(nx, ny, region_1, region_2, region_3):
-    base_date, base_time = get_ultrashort_base_time()
-    serviceKey = "T38Xs/J3skbx5QujsH/ZfPUIDlfyGqvCcjw+DekGON1+Ul+DXg1KueJlW0zUHGEIpidKOPzgyiDqAM8jQZ/dUg=="
+SERVICE_KEY = "T38Xs/J3skbx5QujsH/ZfPUIDlfyGqvCcjw+DekGON1+Ul+DXg1KueJlW0zUHGEIpidKOPzgyiDqAM8jQZ/dUg=="
+ULTRA_SRT_NCST_URL = "http://apis.data.go.kr/1360000/VilageFcstInfoService_2.0/getUltraSrtNcst"
+VILAGE_FCST_URL = "http://apis.data.go.kr/1360000/VilageFcstInfoService_2.0/getVilageFcst"
+
+# 연결 재사용(keep-alive) 세션, 타임아웃(연결, 읽기) 및 재시도 설정
+REQUEST_TIMEOUT = (3.05, 10)
+REQUEST_RETRIES = 2
+REQUEST_POOL_SIZE = 16
+
+
+def create_session():
+    retry = Retry(total=REQUEST_RETRIES, backoff_factor=0.3, status_forcelist=[500, 502, 503, 504],
+                  allowed_methods=['GET'], raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=REQUEST_POOL_SIZE, pool_maxsize=REQUEST_POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
 
-    url = "http://apis.data.go.kr/1360000/VilageFcstInfoService_2.0/getUltraSrtNcst"
+
+session = create_session()
+# 초단기실황과 단기예보를 동시에 요청하기 위한 풀
+request_pool = ThreadPoolExecutor(max_workers=REQUEST_POOL_SIZE, thread_name_prefix='weather-request')
+
+
+# 기상청 API 호출 (실패 시 None)
+def request_items(url, nx, ny, base_date, base_time):
     params = {
-        "serviceKey": serviceKey,
+        "serviceKey": SERVICE_KEY,
         "numOfRows": "1000",
         "pageNo": "1",
         "dataType": "JSON",
@@ -86,126 +147,300 @@ def get_current_weather_info(nx, ny, region_1, region_2, region_3):
         "ny": ny
     }
 
-    response = requests.get(url, params=params)
-    if response.status_code == 200:
+    try:
+        response = session.get(url, params=params, timeout=REQUEST_TIMEOUT)
+    except requests.exceptions.RequestException as e:
+        log.error(f"Request failed: {e}")
+        return None
+    if response.status_code != 200:
+        log.error(f"HTTP error {response.status_code}")
+        return None
+    try:
+        data = response.json()
+    except requests.exceptions.JSONDecodeError as e:
+        log.error(f"JSON decoding failed: {e} - Response text: {response.text}")
+        return None
+    if data['response']['header']['resultCode'] != '00':
+        log.error(f"Error: {data['response']['header']['resultMsg']}")
+        return None
+    return data['response']['body']['items']['item']
+
+
+# 초단기실황 (현재 기온, 습도, 풍속, 날씨)
+def fetch_nowcast(nx, ny, base_date, base_time):
+    items = request_items(ULTRA_SRT_NCST_URL, nx, ny, base_date, base_time)
+    if items is None:
+        return None
+
+    current_temp = None
+    humidity = None
+    wind_speed = None
+    weather_description = None
+    sky_code = None
+    visibility = None  # 가시거리(안개)
+
+    for item in items:
+        category = item['category']
+        fcst_value = item['obsrValue']
+
         try:
-            data = response.json()
-            if data['response']['header']['resultCode'] == '00':
-                items = data['response']['body']['items']['item']
-
-                current_temp = None
-                humidity = None
-                wind_speed = None
-                weather_description = None
-                sky_code = None
-                visibility = None  # 가시거리(안개)
-
-                for item in items:
-                    category = item['category']
-                    fcst_value = item['obsrValue']
-
-                    try:
-                        fcst_value = float(fcst_value)
-                    except ValueError:
-                        continue
-
-                    if category == 'T1H':  # 기온
-                        current_temp = fcst_value
-                    elif category == 'REH':  # 습도
-                        humidity = fcst_value
-                    elif category == 'WSD':  # 풍속
-                        wind_speed = fcst_value
-                    elif category == 'PTY':  # 강수형태
-                        weather_description = int(fcst_value)
-                    elif category == 'SKY':  # 구름상태
-                        sky_code = int(fcst_value)
-                    elif category == 'VVV':  # 가시거리
-                        visibility = fcst_value
-
-                weather = None
-                if weather_description in [1, 2, 5, 6]:  # 비, 비/눈, 빗방울, 빗방울눈날림
-                    weather = '비'
-                elif weather_description in [3, 7]:  # 눈, 눈날림
-                    weather = '눈'
-                elif sky_code == 1:  # 맑음
-                    weather = '맑음'
-                elif sky_code == 3:  # 구름많음
-                    weather = '구름 많음'
-                elif sky_code == 4:  # 흐림
-                    weather = '흐림'
-                elif humidity >=70:
-                        weather = '구름많음'
-                elif visibility is not None and visibility < 1:
-                    weather = '안개'
-                else:
-                    weather = '맑음'
-
-
-                # 단기예보에서 최고/최저 기온 가져오기
-                base_date, base_time = get_short_base_time()
-                url = "http://apis.data.go.kr/1360000/VilageFcstInfoService_2.0/getVilageFcst"
-                params = {
-                    "serviceKey": serviceKey,
-                    "numOfRows": "1000",
-                    "pageNo": "1",
-                    "dataType": "JSON",
-                    "base_date": base_date,
-                    "base_time": base_time,
-                    "nx": nx,
-                    "ny": ny
-                }
-                response = requests.get(url, params=params)
-                if response.status_code == 200:
-                    try:
-                        data = response.json()
-                        if data['response']['header']['resultCode'] == '00':
-                            items = data['response']['body']['items']['item']
-
-                            max_temp = None
-                            min_temp = None
-
-                            for item in items:
-                                category = item['category']
-                                fcst_value = item['fcstValue']
-                                fcst_time = item['fcstTime']
-
-                                try:
-                                    fcst_value = float(fcst_value)
-                                except ValueError:
-                                    continue
-
-                                if category == 'TMX':  # 최고기온
-                                    if max_temp is None or fcst_value > max_temp:
-                                        max_temp = fcst_value
-                                elif category == 'TMN':  # 최저기온
-                                    if min_temp is None or fcst_value < min_temp:
-                                        min_temp = fcst_value
-
-                            weather_info = {
-                                "region": f"{region_1} {region_2}",
-                                "currentTemp": current_temp,
-                                "maxTemp": max_temp,
-                                "minTemp": min_temp,
-                                "humidity": humidity,
-                                "weather": weather,
-                                "windSpeed": wind_speed
-                            }
-                            return weather_info
-                        else:
-                            log.error(f"Error: {data['response']['header']['resultMsg']}")
-                            return None
-                    except requests.exceptions.JSONDecodeError as e:
-                        log.error(f"JSON decoding failed: {e} - Response text: {response.text}")
-                        return None
+            fcst_value = float(fcst_value)
+        except ValueError:
+            continue
+
+        if category == 'T1H':  # 기온
+            current_temp = fcst_value
+        elif category == 'REH':  # 습도
+            humidity = fcst_value
+        elif category == 'WSD':  # 풍속
+            wind_speed = fcst_value
+        elif category == 'PTY':  # 강수형태
+            weather_description = int(fcst_value)
+        elif category == 'SKY':  # 구름상태
+            sky_code = int(fcst_value)
+        elif category == 'VVV':  # 가시거리
+            visibility = fcst_value
+
+    weather = None
+    if weather_description in [1, 2, 5, 6]:  # 비, 비/눈, 빗방울, 빗방울눈날림
+        weather = '비'
+    elif weather_description in [3, 7]:  # 눈, 눈날림
+        weather = '눈'
+    elif sky_code == 1:  # 맑음
+        weather = '맑음'
+    elif sky_code == 3:  # 구름많음
+        weather = '구름 많음'
+    elif sky_code == 4:  # 흐림
+        weather = '흐림'
+    elif humidity >=70:
+            weather = '구름많음'
+    elif visibility is not None and visibility < 1:
+        weather = '안개'
+    else:
+        weather = '맑음'
+
+    return {
+        "currentTemp": current_temp,
+        "humidity": humidity,
+        "weather": weather,
+        "windSpeed": wind_speed
+    }
+
+
+# 단기예보 (최고/최저 기온)
+def fetch_forecast(nx, ny, base_date, base_time):
+    items = request_items(VILAGE_FCST_URL, nx, ny, base_date, base_time)
+    if items is None:
+        return None
+
+    max_temp = None
+    min_temp = None
+
+    for item in items:
+        category = item['category']
+        fcst_value = item['fcstValue']
+
+        try:
+            fcst_value = float(fcst_value)
+        except ValueError:
+            continue
+
+        if category == 'TMX':  # 최고기온
+            if max_temp is None or fcst_value > max_temp:
+                max_temp = fcst_value
+        elif category == 'TMN':  # 최저기온
+            if min_temp is None or fcst_value < min_temp:
+                min_temp = fcst_value
+
+    return {
+        "maxTemp": max_temp,
+        "minTemp": min_temp
+    }
+
+
+class WeatherCache:
+    """
+    기상청 응답 캐시 (키: (종류, nx, ny, base_date, base_time))
+    - 다음 발표 시각이 되면 base_time 이 바뀌므로 자연스럽게 만료
+    - 새 발표분이 아직 없으면 이전 발표분(max_stale 초 이내)을 바로 응답하고 백그라운드에서 갱신
+    - 같은 키의 동시 요청은 한 번의 API 호출로 합침
+    - 가져오기에 실패한 발표분은 retry_after 초 동안 다시 호출하지 않음 (이전 발표분 또는 None 으로 응답)
+    """
+
+    def __init__(self, max_stale=3 * 60 * 60, max_workers=4, retry_after=60):
+        self.max_stale = max_stale
+        self.retry_after = retry_after
+        self._latest = {}  # (종류, nx, ny) -> (base, 값, 저장 시각)
+        self._inflight = {}  # (종류, nx, ny, base) -> Future
+        self._failed = {}  # (종류, nx, ny) -> (실패한 base, 실패 시각)
+        self._lock = threading.Lock()
+        self._refresh_pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='weather-refresh')
+
+    def _load(self, kind, nx, ny, base, fetch):
+        key = (kind, nx, ny, base)
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+        if not owner:
+            return future.result()
+
+        try:
+            value = fetch(nx, ny, *base)
+            with self._lock:
+                if value is None:
+                    self._failed[(kind, nx, ny)] = (base, time.monotonic())
                 else:
-                    log.error(f"HTTP error {response.status_code}")
-                    return None
-            else:
-                log.error(f"Error: {data['response']['header']['resultMsg']}")
-                return None
-        except requests.exceptions.JSONDecodeError as e:
-            log.error(f"JSON decoding failed: {e} - Response text: {response.text}")
+                    self._failed.pop((kind, nx, ny), None)
+                    cached = self._latest.get((kind, nx, ny))
+                    if cached is None or cached[0] <= base:
+                        self._latest[(kind, nx, ny)] = (base, value, time.monotonic())
+            future.set_result(value)
+            return value
+        except Exception as e:
+            with self._lock:
+                self._failed[(kind, nx, ny)] = (base, time.monotonic())
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _backing_off(self, kind, nx, ny, base):
+        # 같은 발표분을 최근 retry_after 초 안에 가져오지 못했으면 True
+        with self._lock:
+            failed = self._failed.get((kind, nx, ny))
+        return failed is not None and failed[0] == base and time.monotonic() - failed[1] < self.retry_after
+
+    def get(self, kind, nx, ny, base, fetch):
+        with self._lock:
+            cached = self._latest.get((kind, nx, ny))
+        backing_off = self._backing_off(kind, nx, ny, base)
+        if cached is not None:
+            cached_base, value, stored_at = cached
+            if cached_base == base:
+                return value
+            if time.monotonic() - stored_at < self.max_stale:
+                # 이전 발표분으로 응답하고 새 발표분은 백그라운드에서 가져옴
+                if not backing_off:
+                    self._refresh_pool.submit(self._load, kind, nx, ny, base, fetch)
+                return value
+        if backing_off:
             return None
-    else:
-        log.error(f"HTTP error {response.status_code}")
-        return None
\ No newline at end of file
+        return self._load(kind, nx, ny, base, fetch)
+
+    def has(self, kind, nx, ny, base):
+        # 해당 발표분이 이미 캐시되어 있으면 True
+        with self._lock:
+            cached = self._latest.get((kind, nx, ny))
+        return cached is not None and cached[0] == base
+
+    def refresh(self, kind, nx, ny, base, fetch):
+        # 캐시 상태와 관계없이 해당 발표분을 가져와 저장
+        return self._load(kind, nx, ny, base, fetch)
+
+
+weather_cache = WeatherCache()
+
+
+class WeatherPrefetcher:
+    """
+    요청이 많은 격자(nx, ny)의 날씨를 발표 직후 백그라운드에서 미리 갱신
+    - record() 로 격자별 요청 수를 기록하고, 갱신할 때마다 절반으로 줄여 최근 요청에 가중치
+    - poll_interval 초마다 초단기/단기 발표 시각이 바뀌었는지 확인해서 상위 top_n 격자만 갱신
+    - 발표 시각 직후에는 아직 자료가 없을 수 있으므로 모든 격자를 가져왔을 때만 완료로 기록 (아니면 다음 확인 때 재시도)
+    - 분당 max_requests_per_minute 회를 넘지 않도록 호출 간격을 둠
+    """
+
+    def __init__(self, cache, top_n=20, max_requests_per_minute=60, poll_interval=60):
+        self.cache = cache
+        self.top_n = top_n
+        self.max_requests_per_minute = max_requests_per_minute
+        self.poll_interval = poll_interval
+        self._counts = Counter()
+        self._lock = threading.Lock()
+        self._last_base = {}
+        self._thread = None
+
+    def record(self, nx, ny):
+        with self._lock:
+            self._counts[(nx, ny)] += 1
+
+    def hot_cells(self):
+        with self._lock:
+            return [cell for cell, _ in self._counts.most_common(self.top_n)]
+
+    def decay(self):
+        # 갱신을 마칠 때마다 요청 수를 절반으로 줄임
+        with self._lock:
+            for cell in list(self._counts):
+                self._counts[cell] //= 2
+                if not self._counts[cell]:
+                    del self._counts[cell]
+
+    def prefetch(self, kind, base, fetch, cells):
+        # 모든 격자의 해당 발표분을 가져왔으면 True (이미 캐시된 격자는 건너뜀)
+        ok = True
+        for nx, ny in cells:
+            if self.cache.has(kind, nx, ny, base):
+                continue
+            try:
+                if self.cache.refresh(kind, nx, ny, base, fetch) is None:
+                    ok = False
+            except Exception as e:
+                ok = False
+                log.error(f"Weather prefetch failed ({kind}, nx={nx}, ny={ny}): {e}")
+            time.sleep(60 / self.max_requests_per_minute)
+        return ok
+
+    def run_once(self):
+        targets = [('nowcast', get_ultrashort_base_time(), fetch_nowcast),
+                   ('forecast', get_short_base_time(), fetch_forecast)]
+        targets = [(kind, base, fetch) for kind, base, fetch in targets if self._last_base.get(kind) != base]
+        if not targets:
+            return
+        cells = self.hot_cells()
+        done = False
+        for kind, base, fetch in targets:
+            if self.prefetch(kind, base, fetch, cells):
+                self._last_base[kind] = base
+                done = True
+        if done:
+            self.decay()
+
+    def _run(self):
+        while True:
+            self.run_once()
+            time.sleep(self.poll_interval)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='weather-prefetch', daemon=True)
+            self._thread.start()
+
+
+prefetcher = WeatherPrefetcher(weather_cache)
+
+
+# 현재 날씨 정보 가져오기 (초단기실황 + 단기예보 최고/최저 기온)
+def get_current_weather_info(nx, ny, region_1, region_2, region_3):
+    nx, ny = int(nx), int(ny)
+    prefetcher.record(nx, ny)
+    # 두 API 를 동시에 호출해서 지연 시간이 합이 아닌 max(초단기실황, 단기예보)가 되도록 함
+    forecast_future = request_pool.submit(weather_cache.get, 'forecast', nx, ny, get_short_base_time(), fetch_forecast)
+    nowcast = weather_cache.get('nowcast', nx, ny, get_ultrashort_base_time(), fetch_nowcast)
+    forecast = forecast_future.result()
+    if nowcast is None or forecast is None:
+        return None
+
+    weather_info = {
+        "region": f"{region_1} {region_2}",
+        "currentTemp": nowcast['currentTemp'],
+        "maxTemp": forecast['maxTemp'],
+        "minTemp": forecast['minTemp'],
+        "humidity": nowcast['humidity'],
+        "weather": nowcast['weather'],
+        "windSpeed": nowcast['windSpeed']
+    }
+    return weather_info